@@ -11,16 +11,19 @@ POLIGON_VERIFY_URL = os.getenv("POLIGON_VERIFY_URL")
 TASK_NAME = "POLIGON"
 REQUEST_TIMEOUT = 15 # seconds for network requests
 
+# Both calls hit the same host, so share one session to reuse the connection
+session = requests.Session()
+
 print(f"Fetching data from: {POLIGON_DATA_URL}")
 # Fetch data - simplified error handling (requests might still raise exceptions)
-response_data = requests.get(POLIGON_DATA_URL, timeout=REQUEST_TIMEOUT)
+response_data = session.get(POLIGON_DATA_URL, timeout=REQUEST_TIMEOUT)
 response_data.raise_for_status() # Will stop script if status code is 4xx or 5xx
 raw_text_data = response_data.text
 print(raw_text_data)
 print("Data fetched successfully.")
 
 # Process data into a list of non-empty strings (lines)
-string_array = [line.strip() for line in raw_text_data.splitlines() if line.strip()]
+string_array = list(filter(None, map(str.strip, raw_text_data.splitlines())))
 print(string_array)
 
 # Prepare payload for verification
@@ -32,7 +35,7 @@ payload = {
 
 print(f"\nSending verification to: {POLIGON_VERIFY_URL}")
 # Send for verification - simplified error handling
-response_verify = requests.post(POLIGON_VERIFY_URL, json=payload, timeout=REQUEST_TIMEOUT)
+response_verify = session.post(POLIGON_VERIFY_URL, json=payload, timeout=REQUEST_TIMEOUT)
 response_verify.raise_for_status() # Will stop script if status code is 4xx or 5xx
 
 print("Verification request successful.")
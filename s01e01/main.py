@@ -1,10 +1,7 @@
 
 import os
-import sys
 from dotenv import load_dotenv
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from utils import (
     extract_question,
     ask_llm,
@@ -1,17 +1,19 @@
 """Main module for s01e02 task using shared utilities."""
 import os
-import sys
-import json
+import asyncio
+import httpx
+import orjson
 from dotenv import load_dotenv
-from openai import OpenAI
-
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from openai import AsyncOpenAI
 
 from utils import (
     find_flag_in_text,
-    make_request,
+    llm_cache,
+    async_make_request,
+    close_async_session,
     prepare_text_for_search
 )
+from utils.ai import log_prompt_cache_usage
 
 # Load environment variables
 load_dotenv()
@@ -22,6 +24,12 @@ MEMORY_DUMP_URL = os.getenv("MEMORY_DUMP_URL")
 VERIFY_URL = os.getenv("VERIFY_URL")
 HEADERS = {"Content-Type": "application/json"}
 
+# One client for the whole run so calls share its connection pool
+OPENAI_CLIENT = AsyncOpenAI(
+    api_key=OPENAI_API_KEY,
+    http_client=httpx.AsyncClient(limits=httpx.Limits(max_keepalive_connections=10)),
+)
+
 # NOTE: decieded to just copy paste content manually
 # def get_robot_memory_dump():
 #     """🔍 Fetch the robot memory dump file."""
@@ -58,14 +66,14 @@ zdemaskowania istoty, która nie zna tych informacji.
     context += robot_knowledge
     return context
 
-def start_verification():
+async def start_verification():
     """🤖 Start the verification process by sending READY command."""
     print("🚀 [*] Starting verification process...")
     payload = {"text": "READY", "msgID":"0"}
-    response = make_request(VERIFY_URL, method="post", data=json.dumps(payload), headers=HEADERS)
-    return response.json()
+    response = await async_make_request(VERIFY_URL, method="post", data=orjson.dumps(payload), headers=HEADERS)
+    return orjson.loads(await response.read())
 
-def answer_question(question, message_id, robot_context):
+async def answer_question(question, message_id, robot_context):
     """❓ Answer verification question using robot knowledge."""
     print(f"❓ [?] Robot question: {question}")
     
@@ -73,7 +81,7 @@ def answer_question(question, message_id, robot_context):
     user_prompt = f"Question from robot: {question}\nAnswer only with the exact response a robot would give, based on the memory dump."
     
     # Get answer from LLM
-    answer = ask_llm_with_context(user_prompt, robot_context)
+    answer = await ask_llm_with_context(user_prompt, robot_context)
     print(f"✅ [+] Generated answer: {answer}")
     
     # Prepare response payload
@@ -84,22 +92,32 @@ def answer_question(question, message_id, robot_context):
     
     return payload
 
-def ask_llm_with_context(question, context, model="gpt-4o"):
+async def ask_llm_with_context(question, context, model="gpt-4o", temperature=0):
     """🤖 Ask LLM with specific context."""
-    client = OpenAI(api_key=OPENAI_API_KEY)
-    response = client.chat.completions.create(
+    # The system context goes first and is never changed, so repeated calls hit the prompt cache
+    messages = [
+        {"role": "system", "content": context},
+        {"role": "user", "content": question},
+    ]
+    cache_key = llm_cache.make_key(model, messages, temperature)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    response = await OPENAI_CLIENT.chat.completions.create(
         model=model,
-        messages=[
-            {"role": "system", "content": context},
-            {"role": "user", "content": question},
-        ]
+        messages=messages,
+        temperature=temperature,
     )
-    return response.choices[0].message.content.strip()
+    log_prompt_cache_usage(response.usage)
+    answer = response.choices[0].message.content.strip()
+    llm_cache.set(cache_key, answer)
+    return answer
 
-def run_verification_process(robot_context):
+async def run_verification_process(robot_context):
     """🔄 Run the complete verification process."""
     # Start verification
-    response = start_verification()
+    response = await start_verification()
     print(f"📩 [+] Robot response: {response}")
     
     if 'text' not in response or 'msgID' not in response:
@@ -109,22 +127,22 @@ def run_verification_process(robot_context):
     question = response['text']
     message_id = response['msgID']
     
-    payload = answer_question(question, message_id, robot_context)
+    payload = await answer_question(question, message_id, robot_context)
     
     print("📤 [*] Sending answer to robot...")
-    response = make_request(VERIFY_URL, method="post", data=json.dumps(payload), headers=HEADERS)
-    response_data = response.json()
+    response = await async_make_request(VERIFY_URL, method="post", data=orjson.dumps(payload), headers=HEADERS)
+    response_data = orjson.loads(await response.read())
     print(f"📩 [+] Robot response: {response_data}")
     
     if 'text' in response_data and 'msgID' in response_data:
-        cleaned_text = prepare_text_for_search(response.text)
+        cleaned_text = prepare_text_for_search(await response.text())
         flag = find_flag_in_text(cleaned_text)
         print(f"🚩 [+] Flag found: {flag}")
         return flag
 
     return None
 
-def main():
+async def main():
     # Get robot memory dump
     # memory_dump = get_robot_memory_dump()
     
@@ -132,7 +150,10 @@ def main():
     robot_context = create_context_with_robot_knowledge()
     
     # Run verification process
-    flag = run_verification_process(robot_context)
+    try:
+        flag = await run_verification_process(robot_context)
+    finally:
+        await close_async_session()
     
     if flag:
         print("✅ [+] Task completed successfully!")
@@ -140,4 +161,4 @@ def main():
         print("❌ [-] Failed to complete task")
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
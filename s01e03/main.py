@@ -9,18 +9,22 @@ This script:
 """
 import os
 import sys
-import json
 import re
+import ast
+import operator
+import asyncio
+import numpy as np
+import orjson
 from dotenv import load_dotenv
-
-# Add parent directory to Python path to allow imports from shared utils
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from openai import AsyncOpenAI
 
 from utils import (
     make_request,
-    ask_llm,
-    find_flag_in_text
+    make_submitter,
+    find_flag_in_text,
+    llm_cache
 )
+from utils.ai import DEFAULT_CONTEXT
 
 # Load environment variables
 load_dotenv()
@@ -31,36 +35,122 @@ CENTRALA_SOURCE_URL = os.getenv("CENTRALA_SOURCE_URL")
 CENTRALA_REPORT_URL = os.getenv("CENTRALA_REPORT_URL")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+# Resolve the templated URL once instead of on every call
+SOURCE_URL = CENTRALA_SOURCE_URL.format(API_KEY=API_KEY) if CENTRALA_SOURCE_URL else None
+submit_report = make_submitter("JSON", API_KEY, CENTRALA_REPORT_URL)
+
+# Regexes used per test item / per response, compiled once at import
+CALCULATION_PATTERN = re.compile(r'^\s*[\d\s\+\-\*\/\(\)]+\s*$')
+NUMBERED_ANSWER_PATTERN = re.compile(r'^\s*(\d+)\.\s*(.*?)(?=\s*\d+\.\s*|\Z)', re.MULTILINE | re.DOTALL)
+LEADING_NUMBER_PATTERN = re.compile(r'^\s*\d+\.\s*')
+SIMPLE_CALCULATION_PATTERN = re.compile(r'\s*(\d+)\s*([\+\-\*\/])\s*(\d+)\s*')
+
+BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+UNARY_OPERATORS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+SYMBOL_OPERATORS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+}
+# Integer operators handled by the vectorized pass in fix_calculations
+VECTOR_OPERATOR_CODES = {"+": 0, "-": 1, "*": 2}
+# int64 arithmetic wraps around silently; operands below 2**31 keep even a product in range,
+# anything larger goes through safe_calc with exact Python ints
+VECTOR_OPERAND_LIMIT = 2 ** 31
+VECTOR_ANSWER_LIMIT = 2 ** 63
+
 def download_json_file():
     """Download the JSON calibration file."""
     print("🔍 [*] Downloading JSON calibration file...")
     try:
-        response = make_request(CENTRALA_SOURCE_URL.format(API_KEY=API_KEY))
-        return json.loads(response.text)
+        # Parse straight from the response bytes, skipping the intermediate str
+        with make_request(SOURCE_URL, stream=True) as response:
+            return orjson.loads(response.content)
     except Exception as e:
         print(f"❌ [-] Error downloading or parsing file: {str(e)}")
         sys.exit(1)
 
+def _evaluate_node(node):
+    """Evaluate an arithmetic AST node, rejecting anything else."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+        return BINARY_OPERATORS[type(node.op)](_evaluate_node(node.left), _evaluate_node(node.right))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+        return UNARY_OPERATORS[type(node.op)](_evaluate_node(node.operand))
+    raise ValueError(f"Unsupported expression element: {ast.dump(node)}")
+
+def safe_calc(expression):
+    """Evaluate a basic arithmetic expression without eval."""
+    # Fast path for the common "a + b" form
+    match = SIMPLE_CALCULATION_PATTERN.fullmatch(expression)
+    if match:
+        left, symbol, right = match.groups()
+        return SYMBOL_OPERATORS[symbol](int(left), int(right))
+    return _evaluate_node(ast.parse(expression.strip(), mode='eval').body)
+
 def fix_calculations(test_data):
     """Fix calculation errors in test data."""
     print("🧮 [*] Fixing calculation errors...")
     fixed_count = 0
     
+    # Collect simple "a OP b" integer questions for one vectorized pass
+    vector_items = []
+    lefts, rights, op_codes, current_answers = [], [], [], []
+    
     for item in test_data:
         question = item["question"]
         current_answer = item["answer"]
         
         # Check if the question is a calculation (contains numbers and operators)
-        if re.match(r'^\s*[\d\s\+\-\*\/\(\)]+\s*$', question):
-            # Safely evaluate the expression
-            try:
-                correct_answer = eval(question)
-                if current_answer != correct_answer:
-                    print(f"🔧 [-] Fixing: {question} = {current_answer} -> {correct_answer}")
-                    item["answer"] = correct_answer
-                    fixed_count += 1
-            except Exception as e:
-                print(f"⚠️ [!] Warning: Could not evaluate {question}: {str(e)}")
+        if not CALCULATION_PATTERN.match(question):
+            continue
+        
+        match = SIMPLE_CALCULATION_PATTERN.fullmatch(question)
+        if match and match.group(2) in VECTOR_OPERATOR_CODES and isinstance(current_answer, int):
+            left, right = int(match.group(1)), int(match.group(3))
+            if left < VECTOR_OPERAND_LIMIT and right < VECTOR_OPERAND_LIMIT and abs(current_answer) < VECTOR_ANSWER_LIMIT:
+                vector_items.append(item)
+                lefts.append(left)
+                op_codes.append(VECTOR_OPERATOR_CODES[match.group(2)])
+                rights.append(right)
+                current_answers.append(current_answer)
+                continue
+        
+        # Safely evaluate the expression
+        try:
+            correct_answer = safe_calc(question)
+            if current_answer != correct_answer:
+                print(f"🔧 [-] Fixing: {question} = {current_answer} -> {correct_answer}")
+                item["answer"] = correct_answer
+                fixed_count += 1
+        except Exception as e:
+            print(f"⚠️ [!] Warning: Could not evaluate {question}: {str(e)}")
+    
+    if vector_items:
+        left = np.array(lefts, dtype=np.int64)
+        right = np.array(rights, dtype=np.int64)
+        op = np.array(op_codes, dtype=np.int8)
+        answers = np.array(current_answers, dtype=np.int64)
+        
+        correct = np.where(op == 0, left + right, np.where(op == 1, left - right, left * right))
+        
+        # Only touch the items whose answer is actually wrong
+        for idx in np.nonzero(correct != answers)[0]:
+            item = vector_items[idx]
+            correct_answer = int(correct[idx])
+            print(f"🔧 [-] Fixing: {item['question']} = {item['answer']} -> {correct_answer}")
+            item["answer"] = correct_answer
+            fixed_count += 1
     
     print(f"✅ [+] Fixed {fixed_count} calculations")
     return test_data
@@ -88,6 +178,8 @@ def answer_open_questions(test_data):
     
     # Process questions in batches to avoid token limits
     batch_size = 10
+    batches = []
+    prompts = []
     for i in range(0, len(questions_to_answer), batch_size):
         batch_questions = questions_to_answer[i:i+batch_size]
         batch_indices = indices[i:i+batch_size]
@@ -97,8 +189,13 @@ def answer_open_questions(test_data):
         for j, q in enumerate(batch_questions):
             prompt += f"{j+1}. {q}\n"
         
-        response = ask_llm(prompt, OPENAI_API_KEY)
-
+        batches.append((batch_questions, batch_indices))
+        prompts.append(prompt)
+    
+    # Batches are independent, so send them all at once
+    responses = asyncio.run(ask_llm_batches(prompts))
+    
+    for (batch_questions, batch_indices), response in zip(batches, responses):
         # Parse the answers and update the test data
         answers = parse_answers(response, len(batch_questions), batch_questions)
         
@@ -113,13 +210,36 @@ def answer_open_questions(test_data):
     print(f"✅ [+] Answered {answered_count} open questions")
     return test_data
 
+async def ask_llm_batches(prompts, model="gpt-4o", temperature=0):
+    """Send all batch prompts to OpenAI concurrently, skipping cached ones."""
+    client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+
+    async def ask(prompt):
+        messages = [
+            {"role": "system", "content": DEFAULT_CONTEXT},
+            {"role": "user", "content": prompt},
+        ]
+        cache_key = llm_cache.make_key(model, messages, temperature)
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        response = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+        )
+        answer = response.choices[0].message.content.strip()
+        llm_cache.set(cache_key, answer)
+        return answer
+
+    return await asyncio.gather(*[ask(prompt) for prompt in prompts])
+
 def parse_answers(text, expected_count, questions=None):
     """Parse answers from the OpenAI response."""
     answers = []
     
     # Try to parse numbered responses (1. Answer, 2. Answer, etc.)
-    numbered_pattern = re.compile(r'^\s*(\d+)\.\s*(.*?)(?=\s*\d+\.\s*|\Z)', re.MULTILINE | re.DOTALL)
-    matches = numbered_pattern.findall(text)
+    matches = NUMBERED_ANSWER_PATTERN.findall(text)
     
     if matches and len(matches) == expected_count:
         for _, answer in matches:
@@ -129,13 +249,18 @@ def parse_answers(text, expected_count, questions=None):
     # If that doesn't work, split by lines and clean up
     lines = [line.strip() for line in text.split('\n') if line.strip()]
     
+    # One alternation over all questions instead of a substring scan per question
+    question_pattern = None
+    if questions:
+        question_pattern = re.compile('|'.join(re.escape(q.lower()) for q in questions))
+    
     # Try to extract answers from each line
     for line in lines:
         # Remove numbers at the beginning (1., 2., etc.)
-        line = re.sub(r'^\s*\d+\.\s*', '', line)
+        line = LEADING_NUMBER_PATTERN.sub('', line)
         
         # If the line starts with a question, skip it (if questions provided)
-        if questions and any(q.lower() in line.lower() for q in questions):
+        if question_pattern and question_pattern.search(line.lower()):
             continue
         
         answers.append(line)
@@ -153,23 +278,10 @@ def submit_corrected_file(data):
     """Submit the corrected file to the central server."""
     print("📤 [*] Submitting corrected file...")
     
-    # Construct the payload according to the required format
-    payload = {
-        "task": "JSON",
-        "apikey": API_KEY,
-        "answer": data
-    }
-    
     try:
-        # Use make_request from utils for consistency
-        response = make_request(
-            CENTRALA_REPORT_URL, 
-            method="post", 
-            data=json.dumps(payload), 
-            headers={"Content-Type": "application/json"}
-        )
+        response = submit_report(data)
         print(f"✅ [+] Submission response: {response.text}")
-        return response.json()
+        return orjson.loads(response.content)
     except Exception as e:
         print(f"❌ [-] Error submitting file: {str(e)}")
         sys.exit(1)
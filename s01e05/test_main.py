@@ -0,0 +1,36 @@
+"""Regex censorship checks; run with `python -m unittest discover -s s01e05`."""
+import unittest
+
+from main import censor_data_with_regex, find_leaked_data, validate_censorship
+
+
+class CensorDataWithRegexTest(unittest.TestCase):
+    def test_surname_after_capitalised_word_is_censored(self):
+        text = "Podejrzany Jan Nowak mieszka w Krakowie, ul. Szeroka 18. Ma 45 lat."
+        censored = censor_data_with_regex(text)
+        self.assertEqual(censored, "Podejrzany CENZURA mieszka w CENZURA, ul. CENZURA. Ma CENZURA lat.")
+        self.assertTrue(validate_censorship(text, censored))
+
+    def test_street_after_ulicy_is_censored(self):
+        text = "Osoba podejrzana to Jan Nowak, mieszka w Krakowie przy ulicy Tuwima 10. Ma 45 lat."
+        censored = censor_data_with_regex(text)
+        self.assertEqual(censored, "Osoba podejrzana to CENZURA, mieszka w CENZURA przy ulicy CENZURA. Ma CENZURA lat.")
+        self.assertTrue(validate_censorship(text, censored))
+
+
+class ValidateCensorshipTest(unittest.TestCase):
+    def test_leaked_surname_fails_validation(self):
+        text = "Podejrzany Jan Nowak mieszka w Krakowie, ul. Szeroka 18. Ma 45 lat."
+        leaked = "CENZURA Nowak mieszka w CENZURA, ul. CENZURA. Ma CENZURA lat."
+        self.assertEqual(find_leaked_data(text, leaked), ["Nowak"])
+        self.assertFalse(validate_censorship(text, leaked))
+
+    def test_leaked_street_fails_validation(self):
+        text = "Osoba podejrzana to Jan Nowak, mieszka w Krakowie przy ulicy Tuwima 10. Ma 45 lat."
+        leaked = "Osoba podejrzana to CENZURA, mieszka w CENZURA przy ulicy Tuwima 10. Ma CENZURA lat. CENZURA"
+        self.assertEqual(find_leaked_data(text, leaked), ["Tuwima", "Tuwima 10"])
+        self.assertFalse(validate_censorship(text, leaked))
+
+
+if __name__ == "__main__":
+    unittest.main()
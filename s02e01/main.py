@@ -6,20 +6,28 @@ This script:
 2. Transcribes audio files using OpenAI's Whisper model
 3. Analyzes transcriptions to find the street name of the institute where Professor Maj teaches
 4. Submits the answer to the central server
+
+Recordings over 1 MB are re-encoded, and ones still over the Whisper upload limit are split,
+with the ffmpeg binary (not a pip package, install it system-wide). Without ffmpeg files
+under the limit are uploaded as they are.
 """
 import os
 import sys
-import json
+import orjson
 import re
+import asyncio
+import mimetypes
+import mmap
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dotenv import load_dotenv
-from openai import OpenAI
-
-# Add parent directory to Python path to allow imports from shared utils
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from openai import AsyncOpenAI
 
 from utils import (
-    make_request,
+    make_submitter,
     ask_llm,
     find_flag_in_text
 )
@@ -31,6 +39,45 @@ load_dotenv()
 API_KEY = os.getenv("API_KEY")
 CENTRALA_REPORT_URL = os.getenv("CENTRALA_REPORT_URL")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+VERBOSE = os.getenv("VERBOSE") == "1"  # dump intermediate data for debugging
+TRANSCRIPTION_CONCURRENCY = 5  # parallel Whisper uploads, kept low for rate limits
+WHISPER_MAX_FILE_SIZE = 24 * 1024 * 1024  # Whisper API rejects uploads over 25 MB
+SEGMENT_SECONDS = 540  # 9-minute segments stay well under the upload limit
+TRANSCODE_MIN_FILE_SIZE = 1024 * 1024  # smaller files aren't worth an ffmpeg run
+FFMPEG_AVAILABLE = shutil.which("ffmpeg") is not None
+AUDIO_EXTENSIONS = {".m4a", ".mp3", ".wav"}
+submit_report = make_submitter("mp3", API_KEY, CENTRALA_REPORT_URL)
+
+# Street markers in the LLM answer, from most to least reliable. Each is searched on its own,
+# in this order, so a match for one marker can never hide a match for a more reliable one
+STREET_WORDS = r"([A-ZĘÓĄŚŁŻŹĆŃa-zęóąśłżźćń]+(?:\s+[A-ZĘÓĄŚŁŻŹĆŃa-zęóąśłżźćń]+)*)"
+STREET_PATTERNS = [
+    re.compile(r"ULICA:\s+" + STREET_WORDS, re.IGNORECASE),
+    re.compile(r"ul\.\s+" + STREET_WORDS, re.IGNORECASE),
+    re.compile(r"Answer:\s*" + STREET_WORDS, re.IGNORECASE),
+    re.compile(r"instytut\s+znajduje\s+się\s+na\s+ulicy\s+" + STREET_WORDS, re.IGNORECASE),
+]
+
+# Shared by all transcription calls so uploads reuse one connection pool
+OPENAI_CLIENT = AsyncOpenAI(api_key=OPENAI_API_KEY)
+
+# Static instructions only, kept byte-identical across runs so OpenAI can serve them
+# from the prompt cache; the transcriptions are sent in the user message
+ANALYSIS_SYSTEM_PROMPT = """
+ZADANIE  
+Ustal, PRZY JAKIEJ ULICY znajduje się KONKRETNY INSTYTUT uczelni, w którym wykłada profesor Andrzej Maj. Nie interesuje nas adres rektoratu ani ogólna siedziba uczelni – tylko ta jednostka (instytut).
+
+KONTEXT  
+W wiadomości użytkownika, między znacznikami <<<TRANSKRYPCJE_START i <<<TRANSKRYPCJE_STOP, masz pełne transkrypcje nagrań z przesłuchań świadków. Zeznania mogą sobie przeczyć lub uzupełniać; jedno z nagrań (Rafał) jest chaotyczne, więc zwróć uwagę na możliwość błędnych wskazówek. Przeanalizuj wszystkie fragmenty, ale wnioski opieraj wyłącznie na tych informacjach i swojej wiedzy o strukturze polskich uczelni.
+
+INSTRUKCJA ROZUMOWANIA  
+1. Myśl na głos: zapisuj kolejno obserwacje z transkrypcji, wskazując, które fragmenty sugerują możliwy adres.  
+2. Uporządkuj sprzeczne dane; wyjaśnij, które uznajesz za wiarygodne i dlaczego.  
+3. Zderz te obserwacje ze swoją wiedzą o uczelniach w Polsce, aby zidentyfikować nazwę instytutu i przypisaną mu ulicę.  
+4. Na końcu podaj wyłącznie końcową odpowiedź w formacie (czysty string):  
+<nazwa ulicy, numer jeśli występuje>  
+Nie wypisuj pełnych transkrypcji w odpowiedzi.
+"""
 
 
 def get_audio_files():
@@ -50,8 +97,9 @@ def get_audio_files():
     
     try:
         # Get list of audio files
-        audio_files = [os.path.join(audio_dir, file) for file in os.listdir(audio_dir) 
-                       if file.endswith(('.m4a', '.mp3', '.wav'))]
+        with os.scandir(audio_dir) as entries:
+            audio_files = [entry.path for entry in entries
+                           if entry.is_file() and os.path.splitext(entry.name)[1] in AUDIO_EXTENSIONS]
         
         if not audio_files:
             print(f"❌ [-] No audio files found in '{audio_dir}' directory.")
@@ -65,26 +113,88 @@ def get_audio_files():
         sys.exit(1)
 
 
-def transcribe_audio(audio_file_path):
+def transcode_audio(audio_file_path, output_dir):
+    """Re-encode audio as 16 kHz mono Opus, which is what Whisper works with internally."""
+    output_path = os.path.join(output_dir, "transcoded.ogg")
+    subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-y", "-i", audio_file_path, "-ac", "1", "-ar", "16000",
+         "-c:a", "libopus", "-b:a", "24k", output_path],
+        check=True
+    )
+    print(f"🗜️ [*] Transcoded {os.path.basename(audio_file_path)}: "
+          f"{os.path.getsize(audio_file_path)} -> {os.path.getsize(output_path)} bytes")
+    return output_path
+
+
+def split_audio(audio_file_path, output_dir):
+    """Split a long audio file into fixed-length segments with ffmpeg."""
+    extension = Path(audio_file_path).suffix
+    output_pattern = os.path.join(output_dir, f"segment_%03d{extension}")
+    subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-i", audio_file_path, "-f", "segment",
+         "-segment_time", str(SEGMENT_SECONDS), "-c", "copy", output_pattern],
+        check=True
+    )
+    return sorted(str(path) for path in Path(output_dir).glob(f"segment_*{extension}"))
+
+
+async def transcribe_file(client, audio_file_path, semaphore):
+    """Send a single file to Whisper, respecting the concurrency limit."""
+    content_type = mimetypes.guess_type(audio_file_path)[0] or "application/octet-stream"
+    async with semaphore:
+        # Hand the SDK a memory-mapped view so the upload doesn't need its own copy of the file
+        with open(audio_file_path, "rb") as audio_file, mmap.mmap(audio_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            transcript = await client.audio.transcriptions.create(
+                model="whisper-1", 
+                file=(os.path.basename(audio_file_path), mapped, content_type)
+            )
+    return transcript.text
+
+
+async def transcribe_audio(client, audio_file_path, semaphore):
     """Transcribe audio file using OpenAI's Whisper model."""
     print(f"🎙️ [*] Transcribing audio: {os.path.basename(audio_file_path)}...")
     
-    client = OpenAI(api_key=OPENAI_API_KEY)
-    
     try:
-        with open(audio_file_path, "rb") as audio_file:
-            transcript = client.audio.transcriptions.create(
-                model="whisper-1", 
-                file=audio_file
-            )
+        with tempfile.TemporaryDirectory() as work_dir:
+            upload_path = audio_file_path
+            if os.path.getsize(audio_file_path) > TRANSCODE_MIN_FILE_SIZE and FFMPEG_AVAILABLE:
+                try:
+                    upload_path = await asyncio.to_thread(transcode_audio, audio_file_path, work_dir)
+                except (subprocess.CalledProcessError, OSError) as e:
+                    # Transcoding only saves upload time; the original is still fine for Whisper
+                    print(f"⚠️ [!] Could not transcode {os.path.basename(audio_file_path)}, "
+                          f"uploading the original: {str(e)}")
+            
+            if os.path.getsize(upload_path) > WHISPER_MAX_FILE_SIZE:
+                if not FFMPEG_AVAILABLE:
+                    raise RuntimeError("file is over the Whisper upload limit and ffmpeg is not installed to split it")
+                # Too big for one upload: transcribe segments concurrently and join them in order
+                segments = await asyncio.to_thread(split_audio, upload_path, work_dir)
+                print(f"✂️ [*] Split {os.path.basename(audio_file_path)} into {len(segments)} segments")
+                segment_texts = await asyncio.gather(*[
+                    transcribe_file(client, segment, semaphore) for segment in segments
+                ])
+                text = " ".join(segment_text.strip() for segment_text in segment_texts)
+            else:
+                text = await transcribe_file(client, upload_path, semaphore)
         
         print(f"✅ [+] Transcription completed for: {os.path.basename(audio_file_path)}")
-        print(transcript.text)
-        return transcript.text
+        if VERBOSE:
+            print(text)
+        return text
     
     except Exception as e:
         print(f"❌ [-] Error transcribing {os.path.basename(audio_file_path)}: {str(e)}")
-        return f"ERROR TRANSCRIBING {os.path.basename(audio_file_path)}: {str(e)}"
+        return None
+
+
+async def transcribe_audio_files(client, audio_files):
+    """Transcribe several audio files concurrently."""
+    semaphore = asyncio.Semaphore(TRANSCRIPTION_CONCURRENCY)
+    return await asyncio.gather(*[
+        transcribe_audio(client, audio_file, semaphore) for audio_file in audio_files
+    ])
 
 
 def analyze_transcriptions(transcriptions):
@@ -94,38 +204,21 @@ def analyze_transcriptions(transcriptions):
     """
     print("🔍 [*] Analyzing transcriptions to find the street name...")
     
-    # Prepare a combined text from all transcriptions
-    combined_text = ""
-    for file_name, transcript in transcriptions.items():
-        combined_text += f"\n--- Transkrypcje od {file_name} ---\n{transcript}\n"
-    
-    # Create prompt with transcriptions embedded
-    system_prompt = f"""
-    ZADANIE  
-    Ustal, PRZY JAKIEJ ULICY znajduje się KONKRETNY INSTYTUT uczelni, w którym wykłada profesor Andrzej Maj. Nie interesuje nas adres rektoratu ani ogólna siedziba uczelni – tylko ta jednostka (instytut).
-
-    KONTEXT  
-    Poniżej masz pełne transkrypcje nagrań z przesłuchań świadków. Zeznania mogą sobie przeczyć lub uzupełniać; jedno z nagrań (Rafał) jest chaotyczne, więc zwróć uwagę na możliwość błędnych wskazówek. Przeanalizuj wszystkie fragmenty, ale wnioski opieraj wyłącznie na tych informacjach i swojej wiedzy o strukturze polskich uczelni.
-
-    <<<TRANSKRYPCJE_START
-    {combined_text}
-    <<<TRANSKRYPCJE_STOP
-
-    INSTRUKCJA ROZUMOWANIA  
-    1. Myśl na głos: zapisuj kolejno obserwacje z transkrypcji, wskazując, które fragmenty sugerują możliwy adres.  
-    2. Uporządkuj sprzeczne dane; wyjaśnij, które uznajesz za wiarygodne i dlaczego.  
-    3. Zderz te obserwacje ze swoją wiedzą o uczelniach w Polsce, aby zidentyfikować nazwę instytutu i przypisaną mu ulicę.  
-    4. Na końcu podaj wyłącznie końcową odpowiedź w formacie (czysty string):  
-    <nazwa ulicy, numer jeśli występuje>  
-    Nie wypisuj pełnych transkrypcji w odpowiedzi.
-    """
+    # Transcriptions go in the user message, after the static system prompt
+    combined_text = "".join(
+        f"\n--- Transkrypcje od {file_name} ---\n{transcript}\n"
+        for file_name, transcript in transcriptions.items()
+    )
     
     print("🤖 [*] Asking LLM to analyze the transcriptions...")
     response = ask_llm(
-        question="Analizuj transkrypcje i znajdź ulicę, gdzie znajduje się instytut profesora Maja.",
+        question=(
+            f"<<<TRANSKRYPCJE_START\n{combined_text}\n<<<TRANSKRYPCJE_STOP\n\n"
+            "Analizuj transkrypcje i znajdź ulicę, gdzie znajduje się instytut profesora Maja."
+        ),
         api_key=OPENAI_API_KEY,
         model="gpt-4o",
-        context=system_prompt
+        context=ANALYSIS_SYSTEM_PROMPT
     )
     
     print("🔎 [*] LLM response:")
@@ -144,33 +237,10 @@ def analyze_transcriptions(transcriptions):
 
 def extract_street_name(text):
     """Extract the street name from the LLM's response."""
-    # Look for direct mentions of the street
-    direct_pattern = r"(?i)ULICA:\s+([A-ZĘÓĄŚŁŻŹĆŃa-zęóąśłżźćń]+(?:\s+[A-ZĘÓĄŚŁŻŹĆŃa-zęóąśłżźćń]+)*)"
-    direct_match = re.search(direct_pattern, text)
-    
-    if direct_match:
-        return direct_match.group(1).strip()
-    
-    # Look for 'ul.' pattern
-    ul_pattern = r"(?i)ul\.\s+([A-ZĘÓĄŚŁŻŹĆŃa-zęóąśłżźćń]+(?:\s+[A-ZĘÓĄŚŁŻŹĆŃa-zęóąśłżźćń]+)*)"
-    ul_match = re.search(ul_pattern, text)
-    
-    if ul_match:
-        return ul_match.group(1).strip()
-    
-    # Look for a clear answer format
-    answer_pattern = r"(?i)Answer:[\s\n]*([A-ZĘÓĄŚŁŻŹĆŃa-zęóąśłżźćń]+(?:\s+[A-ZĘÓĄŚŁŻŹĆŃa-zęóąśłżźćń]+)*)"
-    answer_match = re.search(answer_pattern, text)
-    
-    if answer_match:
-        return answer_match.group(1).strip()
-    
-    # Fallback: Try to find the most confidently stated street name
-    confident_pattern = r"(?i)instytut\s+znajduje\s+się\s+na\s+ulicy\s+([A-ZĘÓĄŚŁŻŹĆŃa-zęóąśłżźćń]+(?:\s+[A-ZĘÓĄŚŁŻŹĆŃa-zęóąśłżźćń]+)*)"
-    confident_match = re.search(confident_pattern, text)
-    
-    if confident_match:
-        return confident_match.group(1).strip()
+    for pattern in STREET_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return match.group(1).strip()
     
     return None
 
@@ -179,54 +249,60 @@ def submit_answer(street_name):
     """Submit the street name to the central server."""
     print("📤 [*] Submitting answer to the central server...")
     
-    payload = {
-        "task": "mp3",
-        "apikey": API_KEY,
-        "answer": street_name
-    }
-    
     try:
-        response = make_request(
-            CENTRALA_REPORT_URL,
-            method="post",
-            data=json.dumps(payload),
-            headers={"Content-Type": "application/json"}
-        )
+        response = submit_report(street_name)
         
         print(f"✅ [+] Submission response: {response.text}")
-        return response.json()
+        return orjson.loads(response.content)
     except Exception as e:
         print(f"❌ [-] Error submitting answer: {str(e)}")
         sys.exit(1)
 
 
-def cache_transcriptions(audio_files, cache_dir="transcription_cache"):
+def cache_transcriptions(audio_files, client=OPENAI_CLIENT, cache_dir="transcription_cache"):
     """Cache transcriptions to avoid re-transcribing audio files."""
     # Create cache directory if it doesn't exist
-    if not os.path.exists(cache_dir):
-        os.makedirs(cache_dir)
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
     
-    transcriptions = {}
+    # One directory listing instead of an exists() call per file
+    with os.scandir(cache_dir) as entries:
+        cached_names = {entry.name for entry in entries if entry.is_file()}
     
+    cached_files = []
+    missing_files = []
     for audio_file in audio_files:
-        file_name = os.path.basename(audio_file)
-        cache_file = os.path.join(cache_dir, f"{file_name}.txt")
-        
-        # Check if transcription is already cached
-        if os.path.exists(cache_file):
-            print(f"📂 [*] Loading cached transcription for {file_name}...")
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                transcriptions[file_name] = f.read()
+        if f"{os.path.basename(audio_file)}.txt" in cached_names:
+            cached_files.append(audio_file)
         else:
-            # Transcribe and cache
-            transcription = transcribe_audio(audio_file)
+            missing_files.append(audio_file)
+    
+    transcriptions = {}
+    if cached_files:
+        print(f"📂 [*] Loading {len(cached_files)} cached transcriptions...")
+        cache_paths = [cache_dir / f"{os.path.basename(f)}.txt" for f in cached_files]
+        with ThreadPoolExecutor() as executor:
+            cached_texts = executor.map(lambda path: path.read_text(encoding="utf-8"), cache_paths)
+            for audio_file, transcription in zip(cached_files, cached_texts):
+                transcriptions[os.path.basename(audio_file)] = transcription
+    
+    # Transcribe all uncached files at once and cache them
+    if missing_files:
+        new_transcriptions = asyncio.run(transcribe_audio_files(client, missing_files))
+        for audio_file, transcription in zip(missing_files, new_transcriptions):
+            file_name = os.path.basename(audio_file)
+            # Failed transcriptions are left out and not cached, so the next run retries them
+            if transcription is None:
+                print(f"⚠️ [!] Skipping {file_name}, it will be missing from the analysis")
+                continue
             transcriptions[file_name] = transcription
             
             # Save to cache
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                f.write(transcription)
+            (cache_dir / f"{file_name}.txt").write_text(transcription, encoding="utf-8")
     
-    return transcriptions
+    # Keep the original file order for the analysis prompt
+    return {os.path.basename(f): transcriptions[os.path.basename(f)]
+            for f in audio_files if os.path.basename(f) in transcriptions}
 
 
 def main():
@@ -235,11 +311,13 @@ def main():
     
     # Step 1: Get audio files from the przesluchania directory
     audio_files = get_audio_files()
-    print(audio_files)
+    if VERBOSE:
+        print(audio_files)
     
     # Step 2: Transcribe audio files (with caching)
     transcriptions = cache_transcriptions(audio_files)
-    print(transcriptions)
+    if VERBOSE:
+        print(transcriptions)
     
     # Step 3: Analyze transcriptions to find the street name
     street_name = analyze_transcriptions(transcriptions)
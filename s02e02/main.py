@@ -9,12 +9,14 @@ This script:
 """
 import os
 import sys
-import base64
+import io
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import OpenAI, BadRequestError, NotFoundError
+from PIL import Image
 
-# Add parent directory to Python path to allow imports from shared utils
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import disk_cache
 
 load_dotenv()
 
@@ -22,6 +24,70 @@ load_dotenv()
 API_KEY = os.getenv("API_KEY")
 CENTRALA_REPORT_URL = os.getenv("CENTRALA_REPORT_URL")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+VERBOSE = os.getenv("VERBOSE") == "1"  # dump intermediate data for debugging
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp"}
+# gpt-4o "high" detail scales images to fit 2048x2048 and then to a 768 px short edge,
+# so anything above that is uploaded and then thrown away
+MAX_LONG_EDGE = 2048
+MAX_SHORT_EDGE = 768
+JPEG_QUALITY = 85
+
+# Shared by the upload threads and the analysis call
+OPENAI_CLIENT = OpenAI(api_key=OPENAI_API_KEY)
+
+# Static parts of the vision request, built once at import; only the image parts change per call
+MAP_ANALYSIS_SYSTEM_PROMPT = """
+[Map Fragment Analysis – Identify the City v2]
+
+You will receive **exactly four map images** (map-1 … map-4).  
+Your task is to identify the **single Polish city** that **at least three** of these fragments belong to.
+
+<prompt_objective>
+Determine the Polish city shared by ≥ 3 fragments with high confidence, after verifying that every cited street or landmark truly exists in that city.
+</prompt_objective>
+
+<prompt_rules>
+STEP 1 – EXTRACT  
+• For each fragment, list **all legible street names** and **all visible landmarks** (churches, cemeteries, stations, parks, rivers, etc.).  
+• Note compass hints (river bend, coastline, grid vs. radial plan).
+
+STEP 2 – CANDIDATE MATCHING  
+• Generate a **candidate city list** where ≥ 2 items (street or landmark) from a fragment co-exist.  
+• Cross-check every fragment against each candidate.
+
+STEP 3 – CONSISTENCY CHECK  
+• A city is valid iff **≥ 3 fragments** can be mapped there **and** each of those fragments has ≥ 2 verified items present in that city.  
+• Mark any fragment that fails this test as **decoy**.
+
+STEP 4 – CERTAINTY THRESHOLD  
+• If no city meets the criteria above with **≥ 80 % confidence**, output **`unknown`** (lowercase, no quotes).  
+• Otherwise proceed.
+
+STEP 5 – SELF-REVISION  
+• Silently review your reasoning: *“Do all verified streets/landmarks truly exist in the chosen city? Could another city fit better?”*  
+• If a contradiction appears, return to STEP 2.
+
+OUTPUT FORMAT (STRICT)  
+• Return the city name in lowercase without diacritics (e.g. `krakow`) and whole reasoning behind the final answer.  
+
+EXPLICITLY FORBIDDEN  
+• Guessing without verification.  
+• Including any explanation, confidence score, or scratch notes in the final answer.  
+• Outputting more than one token except the city or `unknown`.
+</prompt_rules>
+
+<prompt_examples>
+USER (images) → AI: wroclaw
+USER (3×Lublin, 1×Łódź) → AI: lublin
+USER (no city passes threshold) → AI: unknown
+</prompt_examples>
+
+"""
+MAP_ANALYSIS_TEXT_PART = {
+    "type": "input_text",
+    "text": "Przeanalizuj te cztery fragmenty mapy i określ, z jakiego miasta one pochodzą. Uwaga: jeden z fragmentów może pochodzić z innego miasta (jest błędny). Zwróć nazwę miasta, z którego pochodzą pozostałe fragmenty.",
+}
 
 
 def get_map_fragments():
@@ -40,8 +106,9 @@ def get_map_fragments():
     
     try:
         # Get list of image files
-        image_files = [os.path.join(map_dir, file) for file in os.listdir(map_dir) 
-                       if file.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp'))]
+        with os.scandir(map_dir) as entries:
+            image_files = [entry.path for entry in entries
+                           if entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS]
         
         if not image_files:
             print(f"❌ [-] No image files found in '{map_dir}' directory.")
@@ -55,104 +122,91 @@ def get_map_fragments():
         sys.exit(1)
 
 
-def encode_image(image_path):
-    """Encode image file to base64."""
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode('utf-8')
-
-
-def analyze_map_fragments(image_files):
-    """
-    Analyze map fragments using OpenAI's vision model to determine the city.
-    """
-    print("🔍 [*] Analyzing map fragments...")
-    
-    # Prepare encoded images
-    encoded_images = []
-    for image_path in image_files:
-        print(f"📊 [*] Encoding image: {os.path.basename(image_path)}...")
-        encoded_images.append(encode_image(image_path))
-    
-    # Create prompt with detailed instructions
-    system_prompt = """
-    [Map Fragment Analysis – Identify the City v2]
-
-    You will receive **exactly four map images** (map-1 … map-4).  
-    Your task is to identify the **single Polish city** that **at least three** of these fragments belong to.
-
-    <prompt_objective>
-    Determine the Polish city shared by ≥ 3 fragments with high confidence, after verifying that every cited street or landmark truly exists in that city.
-    </prompt_objective>
-
-    <prompt_rules>
-    STEP 1 – EXTRACT  
-    • For each fragment, list **all legible street names** and **all visible landmarks** (churches, cemeteries, stations, parks, rivers, etc.).  
-    • Note compass hints (river bend, coastline, grid vs. radial plan).
-
-    STEP 2 – CANDIDATE MATCHING  
-    • Generate a **candidate city list** where ≥ 2 items (street or landmark) from a fragment co-exist.  
-    • Cross-check every fragment against each candidate.
-
-    STEP 3 – CONSISTENCY CHECK  
-    • A city is valid iff **≥ 3 fragments** can be mapped there **and** each of those fragments has ≥ 2 verified items present in that city.  
-    • Mark any fragment that fails this test as **decoy**.
+def hash_image_files(image_files):
+    """Build a cache key from the image contents rather than their paths."""
+    digest = hashlib.blake2b(digest_size=16)
+    for image_path in sorted(image_files):
+        with open(image_path, "rb") as image_file:
+            digest.update(image_file.read())
+    return digest.digest()
+
+
+def prepare_image(image_path):
+    """Downscale an image to what the vision model actually uses and re-encode it as JPEG."""
+    with Image.open(image_path) as image:
+        image = image.convert("RGB")
+        scale = min(1.0, MAX_LONG_EDGE / max(image.size), MAX_SHORT_EDGE / min(image.size))
+        if scale < 1.0:
+            image = image.resize((round(image.width * scale), round(image.height * scale)), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=JPEG_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def _upload_image(image_path):
+    """Upload an image to OpenAI Files and return its file id."""
+    print(f"📤 [*] Uploading image: {os.path.basename(image_path)}...")
+    file_name = f"{os.path.splitext(os.path.basename(image_path))[0]}.jpg"
+    uploaded_file = OPENAI_CLIENT.files.create(
+        file=(file_name, prepare_image(image_path), "image/jpeg"),
+        purpose="vision"
+    )
+    return uploaded_file.id
 
-    STEP 4 – CERTAINTY THRESHOLD  
-    • If no city meets the criteria above with **≥ 80 % confidence**, output **`unknown`** (lowercase, no quotes).  
-    • Otherwise proceed.
 
-    STEP 5 – SELF-REVISION  
-    • Silently review your reasoning: *“Do all verified streets/landmarks truly exist in the chosen city? Could another city fit better?”*  
-    • If a contradiction appears, return to STEP 2.
+# Both share one cache entry per image; reupload_image (ttl=0) always uploads and overwrites
+# it, for when a cached file id has expired or been deleted on the OpenAI side
+upload_image = disk_cache("s02e02_files", key_func=lambda image_path: hash_image_files([image_path]))(_upload_image)
+reupload_image = disk_cache("s02e02_files", key_func=lambda image_path: hash_image_files([image_path]), ttl=0)(_upload_image)
 
-    OUTPUT FORMAT (STRICT)  
-    • Return the city name in lowercase without diacritics (e.g. `krakow`) and whole reasoning behind the final answer.  
 
-    EXPLICITLY FORBIDDEN  
-    • Guessing without verification.  
-    • Including any explanation, confidence score, or scratch notes in the final answer.  
-    • Outputting more than one token except the city or `unknown`.
-    </prompt_rules>
+def build_input_messages(image_files, upload):
+    """Upload the fragments in parallel and reference each one by file id."""
+    content = [MAP_ANALYSIS_TEXT_PART]
+    with ThreadPoolExecutor(max_workers=len(image_files)) as executor:
+        for file_id in executor.map(upload, image_files):
+            content.append(
+                {
+                    "type": "input_image",
+                    "file_id": file_id,
+                    "detail": "high"
+                }
+            )
+    return [{"role": "user", "content": content}]
 
-    <prompt_examples>
-    USER (images) → AI: wroclaw
-    USER (3×Lublin, 1×Łódź) → AI: lublin
-    USER (no city passes threshold) → AI: unknown
-    </prompt_examples>
 
+@disk_cache("s02e02_vision", key_func=hash_image_files)
+def analyze_map_fragments(image_files):
     """
+    Analyze map fragments using OpenAI's vision model to determine the city.
+    """
+    print("🔍 [*] Analyzing map fragments...")
     
-    # Prepare messages for the API call
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": [
-            {"type": "text", "text": "Przeanalizuj te cztery fragmenty mapy i określ, z jakiego miasta one pochodzą. Uwaga: jeden z fragmentów może pochodzić z innego miasta (jest błędny). Zwróć nazwę miasta, z którego pochodzą pozostałe fragmenty."},
-        ]}
-    ]
-    
-    # Add images to the user message
-    for i, encoded_image in enumerate(encoded_images):
-        messages[1]["content"].append(
-            {
-                "type": "image_url",
-                "image_url": {
-                    "url": f"data:image/jpeg;base64,{encoded_image}"
-                }
-            }
-        )
+    # Upload the fragments as raw bytes (no base64); reruns reuse the cached file ids
+    input_messages = build_input_messages(image_files, upload_image)
     
     print("🤖 [*] Asking vision model to analyze the map fragments...")
     
-    client = OpenAI(api_key=OPENAI_API_KEY)
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=messages,
-    )
+    # Chat Completions only takes images as URLs, so use the Responses API for file ids
+    try:
+        response = OPENAI_CLIENT.responses.create(
+            model="gpt-4o",
+            instructions=MAP_ANALYSIS_SYSTEM_PROMPT,
+            input=input_messages,
+        )
+    except (NotFoundError, BadRequestError) as e:
+        # A cached file id no longer exists; upload everything again and retry once
+        print(f"⚠️ [!] Cached file ids were rejected ({str(e)}), uploading the fragments again...")
+        response = OPENAI_CLIENT.responses.create(
+            model="gpt-4o",
+            instructions=MAP_ANALYSIS_SYSTEM_PROMPT,
+            input=build_input_messages(image_files, reupload_image),
+        )
     
     print("🔎 [*] Vision model response:")
-    print(response.choices[0].message.content)
+    print(response.output_text)
     
-    return response.choices[0].message.content
+    return response.output_text
 
 
 
@@ -162,11 +216,13 @@ def main():
     
     # Step 1: Get map fragments from the map directory
     image_files = get_map_fragments()
-    print(image_files)
+    if VERBOSE:
+        print(image_files)
     
     # Step 2: Analyze map fragments using vision model
     analysis_response = analyze_map_fragments(image_files)
-    print(analysis_response)
+    if VERBOSE:
+        print(analysis_response)
     
     print("✅ [+] Task completed successfully!")
 
@@ -8,13 +8,10 @@ This script:
 """
 import os
 import sys
-import json
+import orjson
 from dotenv import load_dotenv
 
-# Add parent directory to Python path to allow imports from shared utils
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from utils import make_request, find_flag_in_text
+from utils import make_request, make_submitter, find_flag_in_text, disk_cache
 from openai import OpenAI
 
 # Load environment variables
@@ -23,8 +20,13 @@ load_dotenv()
 # Configuration
 API_KEY = os.getenv("API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+VERBOSE = os.getenv("VERBOSE") == "1"  # dump intermediate data for debugging
 ROBOT_DESCRIPTION_URL = os.getenv("ROBOT_DESCRIPTION_URL")
 CENTRALA_REPORT_URL = os.getenv("CENTRALA_REPORT_URL")
+# Generated image URLs expire after about an hour; reuse a cached one only while it has
+# a comfortable margin left, so the central server can still fetch it after submission
+DALLE_URL_TTL = 45 * 60
+submit_report = make_submitter("robotid", API_KEY, CENTRALA_REPORT_URL)
 
 
 def download_robot_description():
@@ -40,6 +42,7 @@ def download_robot_description():
         sys.exit(1)
 
 
+@disk_cache("s02e03_dalle", ttl=DALLE_URL_TTL)
 def generate_robot_image(robot_description):
     """Generate an image of the robot using DALL-E 3."""
     print("🤖 [*] Generating robot image...")
@@ -86,20 +89,8 @@ def submit_image_url(image_url):
     """Submit the image URL to the central server."""
     print("📤 [*] Submitting image URL...")
     
-    # Prepare payload
-    payload = {
-        "task": "robotid",
-        "apikey": API_KEY,
-        "answer": image_url
-    }
-    
     try:
-        response = make_request(
-            CENTRALA_REPORT_URL,
-            method="post",
-            data=json.dumps(payload),
-            headers={"Content-Type": "application/json"}
-        )
+        response = submit_report(image_url)
         
         print(f"✅ [+] Submission response: {response.text}")
         
@@ -110,7 +101,7 @@ def submit_image_url(image_url):
         except Exception as e:
             print(f"⚠️ [!] No flag found in response")
         
-        return response.json()
+        return orjson.loads(response.content)
     except Exception as e:
         print(f"❌ [-] Error submitting image URL: {str(e)}")
         sys.exit(1)
@@ -122,15 +113,18 @@ def main():
     
     # Download robot description
     robot_description = download_robot_description()
-    print(robot_description)
+    if VERBOSE:
+        print(robot_description)
     
     # Generate robot image
     image_url = generate_robot_image(robot_description)
-    print(image_url)
+    if VERBOSE:
+        print(image_url)
     
     # Submit image URL
     result = submit_image_url(image_url)
-    print(result)
+    if VERBOSE:
+        print(result)
     
     print("✅ [+] Task completed successfully!")
 
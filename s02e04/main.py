@@ -12,14 +12,20 @@ import sys
 import json
 import re
 import base64
+import subprocess
+import tempfile
+import shutil
+import hashlib
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dotenv import load_dotenv
 
-# Add parent directory to Python path to allow imports from shared utils
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from utils import make_request, find_flag_in_text
+from utils.ai import openai_retry, log_prompt_cache_usage
 from openai import OpenAI
+from PIL import Image
 
 # Load environment variables
 load_dotenv()
@@ -28,7 +34,141 @@ load_dotenv()
 API_KEY = os.getenv("API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 CENTRALA_REPORT_URL = os.getenv("CENTRALA_REPORT_URL")
+VERBOSE = os.getenv("VERBOSE") == "1"  # per-file progress and raw model output
 CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+SUPPORTED_EXTENSIONS = frozenset({"txt", "png", "mp3"})
+HASH_BLOCK_SIZE = 1024 * 1024
+# Whisper rejects uploads over 25 MB; longer recordings are cut into segments with the ffmpeg
+# binary and transcribed in parallel, small ones (or all of them without ffmpeg) are sent as they are
+WHISPER_MAX_FILE_SIZE = 24 * 1024 * 1024
+SEGMENT_MIN_FILE_SIZE = 1024 * 1024
+FFMPEG_AVAILABLE = shutil.which("ffmpeg") is not None
+SEGMENT_SECONDS = 30
+SEGMENT_WORKERS = 4
+# Images are downscaled and sent as JPEG; "low" detail is a single cheap 512 px tile,
+# set HIGH_DETAIL=1 for full tiling if small print comes back garbled
+MAX_IMAGE_EDGE = 2048
+JPEG_QUALITY = 85
+HIGH_DETAIL = os.getenv("HIGH_DETAIL") == "1"
+IMAGE_DETAIL = "high" if HIGH_DETAIL else "low"
+# Part of the image text cache key and the manifest's rules hash, so changing any of these
+# re-runs OCR and re-categorizes the images instead of reusing text extracted the old way
+IMAGE_OCR_SETTINGS = f"{IMAGE_DETAIL}-{MAX_IMAGE_EDGE}-q{JPEG_QUALITY}"
+MAX_WORKERS = 8  # files processed concurrently; each one makes one or two OpenAI calls
+# Classification goes through the Batch API (half price, no rate-limit pressure) unless
+# --sync is passed for an interactive run
+SYNC_MODE = "--sync" in sys.argv
+BATCH_POLL_INTERVAL = 10  # seconds between batch status checks
+# Batches may take up to 24 h; past this the batch is cancelled and the groups are sent synchronously
+BATCH_MAX_WAIT = 30 * 60
+BATCH_FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+# Files classified per request: bounded by count and by total content size
+GROUP_MAX_ITEMS = 30
+GROUP_MAX_CHARS = 8000
+
+# Shared by all worker threads so every call reuses one connection pool
+OPENAI_CLIENT = OpenAI(api_key=OPENAI_API_KEY)
+
+# Keyword stems taken from the classification criteria below (Polish and English);
+# used to settle clear-cut files without an LLM call
+PEOPLE_KEYWORDS = re.compile(
+    r"odcisk|ślad|notatk|włos|krew|więzi|zakładnik|schwyta|biologiczn|"
+    r"human|prisoner|hostage|fingerprint|footprint",
+    re.IGNORECASE
+)
+HARDWARE_KEYWORDS = re.compile(
+    r"sensor|rotor|zasilan|łożysk|przekaźnik|zwarci|spięci|przegrz|"
+    r"short[- ]circuit|overheat|voltage|battery",
+    re.IGNORECASE
+)
+# Generic stems and the prompt's indirect phrasings: too loose to label a file on their own,
+# but any of them means the file must not be skipped either, so the LLM decides
+PREFILTER_HINTS = re.compile(
+    r"boot|heat signature|subject|spotted|intruder|voice|blood|hair|detain|captive|captured|"
+    r"surveillance|body temperature|człowie|ludzk|osob|istot|naskór|termowizyj|ciepln|obozowisk|przebywa|"
+    r"gear|cooling|failure|broken|damage|leak|faulty|malfunction|machine|component|structural|"
+    r"uszkodz|awari|bateri|wadliw|usterk|drgani|chłodz",
+    re.IGNORECASE
+)
+# A negation can flip a keyword's meaning ("no traces were found"), so such files go to the LLM
+NEGATION_PATTERN = re.compile(r"\b(?:brak\w*|nie|żadn\w*|bez|no|not|none|without)\b", re.IGNORECASE)
+PREFILTER_MIN_HITS = 2  # distinct keywords needed to label a file without the LLM
+
+# Placeholder for the prompt, you can replace with your own.
+# Kept free of leading/trailing whitespace and always sent first, unchanged, so every
+# request shares a byte-identical prefix that OpenAI can serve from the prompt cache
+CATEGORIZATION_SYSTEM_PROMPT = """[Classify Extracted Text from Archive Files]
+
+You are an intelligence filter classifying raw extracted text into one of two categories: people-related evidence or hardware-related malfunctions.
+
+<prompt_objective>
+Label each piece of text as either `people` or `hardware` if it contains relevant information. If it does not match either category, do NOT return anything.
+</prompt_objective>
+
+<prompt_rules>
+- Return ONLY one of the following labels: `people` or `hardware`.
+- DO NOT return `no data`, `unknown`, or any other label.
+- DO NOT explain or summarize.
+- DO NOT fabricate labels for irrelevant or ambiguous input – return nothing at all in such cases.
+
+Classification criteria:
+
+**Label as `people` if the text mentions:**
+- Captured individuals, hostages, prisoners, detainees.
+- Traces of human presence such as:
+  - footprints, fingerprints, blood stains, hair, voice, handwritten notes, body temperature traces, surveillance imagery.
+- Direct or indirect indicators like: “two sets of boots”, “human heat signature”, “unidentified subject spotted”.
+
+**Label as `hardware` if the text mentions:**
+- Physical equipment malfunctions (excluding software issues).
+- Faulty machinery, broken components, overheating, short-circuits, loss of structural integrity, sensor failure.
+- Phrases like: “broken gear”, “cooling system failure”, “detected voltage spike”, “damaged rotor”, “battery leakage”, “faulty connection”.
+
+<prompt_examples>
+USER: "W miejscu zdarzenia odnaleziono dwa odciski butów oraz ręcznie zapisane notatki."
+AI: people
+
+USER: "Moduł sensoryczny przestał reagować po wykryciu anomalii w zasilaniu."
+AI: hardware
+
+USER: "Odczyt wskazuje na obecność istoty biologicznej w strefie 3."
+AI: people
+
+USER: "Kamera termowizyjna zarejestrowała ślad cieplny o ludzkim kształcie."
+AI: people
+
+USER: "Wadliwy przekaźnik spowodował spięcie i zatrzymanie całego układu."
+AI: hardware
+
+USER: "Sygnał GPS został utracony na 3 godziny."
+AI:
+
+USER: "W kanałach wentylacyjnych wykryto ślady włókien organicznych i ludzkiego naskórka."
+AI: people
+
+USER: "Drgania osi obrotu przekroczyły dopuszczalną normę, sugerując uszkodzenie łożyska."
+AI: hardware
+
+USER: "Notatki znalezione przy porzuconym obozowisku sugerują, że przebywały tam przynajmniej dwie osoby."
+AI: people
+</prompt_examples>
+
+Return only: `people` or `hardware`. If nothing fits, return nothing."""
+
+# Categorized results are kept per content hash in a manifest; it is invalidated whenever
+# the prompt, the keyword pre-filter or the image OCR settings change
+MANIFEST_FILE = os.path.join(CACHE_DIR, "manifest.json")
+CATEGORIZATION_RULES_HASH = hashlib.sha256(
+    "\0".join([
+        CATEGORIZATION_SYSTEM_PROMPT,
+        PEOPLE_KEYWORDS.pattern,
+        HARDWARE_KEYWORDS.pattern,
+        PREFILTER_HINTS.pattern,
+        NEGATION_PATTERN.pattern,
+        str(PREFILTER_MIN_HITS),
+        IMAGE_OCR_SETTINGS,
+    ]).encode("utf-8")
+).hexdigest()
 
 
 def get_files_from_directory():
@@ -47,89 +187,179 @@ def get_files_from_directory():
         sys.exit(1)
     
     # Get all files recursively
-    all_files = []
-    for root, _, files in os.walk(files_dir):
-        # Skip the "facts" directory
-        if "facts" in root.lower():
-            print(f"⏭️ [*] Skipping directory: {root}")
-            continue
-        
-        # Skip weapons_tests.zip and other non-relevant files
-        for f in files:
-            if f.endswith(('.txt', '.png', '.mp3')) and not f.startswith('.'):
-                all_files.append(os.path.join(root, f))
+    all_files = list(iter_files(files_dir))
     
     print(f"📊 [*] Found {len(all_files)} files to process")
     
     return all_files
 
 
-def get_file_content(file_path):
+def encode_image_data_url(file_path):
+    """Downscale an image, re-encode it as JPEG and return it as a base64 data URL."""
+    with Image.open(file_path) as image:
+        image = image.convert("RGB")
+        # Anything beyond 2048 px on the long edge is scaled down by the API anyway
+        image.thumbnail((MAX_IMAGE_EDGE, MAX_IMAGE_EDGE), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=JPEG_QUALITY, optimize=True)
+    raw = buffer.getvalue()
+    del buffer
+    # base64 output is pure ASCII, which decodes faster than UTF-8
+    encoded = base64.b64encode(raw).decode("ascii")
+    # Drop the raw bytes before building the URL, so the file, its base64 copy and
+    # the URL are never all alive at once
+    del raw
+    return f"data:image/jpeg;base64,{encoded}"
+
+
+def iter_files(directory):
+    """Yield supported files under a directory, skipping hidden entries and 'facts' directories."""
+    pending_dirs = [directory]
+    while pending_dirs:
+        with os.scandir(pending_dirs.pop()) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                # d_type from readdir tells files and directories apart without a stat call
+                if entry.is_dir():
+                    # Skip the "facts" directory
+                    if "facts" in entry.name.lower():
+                        print(f"⏭️ [*] Skipping directory: {entry.path}")
+                        continue
+                    pending_dirs.append(entry.path)
+                # Skip weapons_tests.zip and other non-relevant files
+                elif entry.is_file() and entry.name.rpartition('.')[2] in SUPPORTED_EXTENSIONS:
+                    yield entry.path
+
+
+def hash_file(file_path):
+    """Return the SHA-256 hex digest of a file, streamed in constant memory."""
+    with open(file_path, "rb") as f:
+        # Python 3.11+ hashes the file in C without a Python-level loop
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        
+        # Older Pythons: refill one buffer instead of allocating a bytes object per block.
+        # The buffer is per call because hash_file runs on several threads at once
+        digest = hashlib.sha256()
+        buffer = bytearray(HASH_BLOCK_SIZE)
+        view = memoryview(buffer)
+        while size := f.readinto(buffer):
+            digest.update(view[:size])
+    return digest.hexdigest()
+
+
+def transcribe_segment(segment_path):
+    """Send a single audio file to Whisper."""
+    with open(segment_path, "rb") as audio_file:
+        audio_bytes = audio_file.read()
+    # Pass bytes rather than the open file so a retry re-sends the whole segment
+    transcription = openai_retry(OPENAI_CLIENT.audio.transcriptions.create)(
+        model="whisper-1",
+        file=(os.path.basename(segment_path), audio_bytes, "audio/mpeg")
+    )
+    return transcription.text
+
+
+def transcribe_audio(file_path):
+    """Transcribe an MP3, splitting long recordings into segments transcribed in parallel."""
+    file_size = os.path.getsize(file_path)
+    if file_size < SEGMENT_MIN_FILE_SIZE:
+        return transcribe_segment(file_path)
+    
+    with tempfile.TemporaryDirectory() as segment_dir:
+        try:
+            if not FFMPEG_AVAILABLE:
+                raise FileNotFoundError("ffmpeg is not installed")
+            # Stream copy, no re-encoding: ffmpeg only cuts the MP3 at frame boundaries
+            subprocess.run(
+                ["ffmpeg", "-loglevel", "error", "-i", file_path, "-f", "segment",
+                 "-segment_time", str(SEGMENT_SECONDS), "-c", "copy",
+                 os.path.join(segment_dir, "segment_%03d.mp3")],
+                check=True
+            )
+        except (subprocess.CalledProcessError, OSError) as e:
+            # Segmenting is only a speed-up; a file under the limit can go to Whisper in one piece
+            if file_size > WHISPER_MAX_FILE_SIZE:
+                raise
+            print(f"⚠️ [!] Could not split {os.path.basename(file_path)} ({str(e)}), transcribing it in one piece")
+            return transcribe_segment(file_path)
+        segments = sorted(str(path) for path in Path(segment_dir).glob("segment_*.mp3"))
+        print(f"✂️ [*] Split {os.path.basename(file_path)} into {len(segments)} segments")
+        with ThreadPoolExecutor(max_workers=SEGMENT_WORKERS) as executor:
+            segment_texts = list(executor.map(transcribe_segment, segments))
+    
+    return " ".join(text.strip() for text in segment_texts)
+
+
+def get_file_content(file_path, file_hash=None):
     """Get the content of a file based on its extension."""
     filename = os.path.basename(file_path)
-    print(f"📄 [*] Processing file: {filename}")
+    if VERBOSE:
+        print(f"📄 [*] Processing file: {filename}")
     
     # Create cache directory if it doesn't exist
     os.makedirs(CACHE_DIR, exist_ok=True)
     
-    # Generate cache filename from the original filename
-    cache_file = os.path.join(CACHE_DIR, f"{filename}.txt")
+    # Process based on file extension
+    ext = os.path.splitext(file_path)[1].lower()
+    content = ""
+    
+    # Key the cache on file contents, so renamed or duplicated files are not sent to
+    # the vision/Whisper models again; image text also depends on how the image was sent
+    cache_key = f"{file_hash or hash_file(file_path)}{ext}"
+    if ext == '.png':
+        cache_key += f".{IMAGE_OCR_SETTINGS}"
+    cache_file = os.path.join(CACHE_DIR, f"{cache_key}.txt")
     
     # Check if file is already cached
     if os.path.exists(cache_file):
-        print(f"🔄 [*] Using cached content for {filename}")
+        if VERBOSE:
+            print(f"🔄 [*] Using cached content for {filename}")
         with open(cache_file, 'r', encoding='utf-8') as f:
             return f.read()
     
-    # Process based on file extension
-    ext = os.path.splitext(file_path)[1].lower()
-    content = ""
-    
     try:
         if ext == '.txt':
             # Read text file
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
-            print(f"📝 [*] Read text file: {filename}")
+            if VERBOSE:
+                print(f"📝 [*] Read text file: {filename}")
                 
         elif ext == '.png':
             # Use OpenAI to extract text from image
-            client = OpenAI(api_key=OPENAI_API_KEY)
-            with open(file_path, "rb") as image_file:
-                response = client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=[
-                        {
-                            "role": "system", 
-                            "content": "You are an image text extraction assistant. Extract ALL text from the image, preserving the exact formatting."
-                        },
-                        {
-                            "role": "user",
-                            "content": [
-                                {"type": "text", "text": "Extract all text from this image:"},
-                                {
-                                    "type": "image_url",
-                                    "image_url": {
-                                        "url": f"data:image/png;base64,{base64.b64encode(image_file.read()).decode('utf-8')}"
-                                    }
+            response = openai_retry(OPENAI_CLIENT.chat.completions.create)(
+                model="gpt-4o",
+                messages=[
+                    {
+                        "role": "system", 
+                        "content": "You are an image text extraction assistant. Extract ALL text from the image, preserving the exact formatting."
+                    },
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "text", "text": "Extract all text from this image:"},
+                            {
+                                "type": "image_url",
+                                "image_url": {
+                                    "url": encode_image_data_url(file_path),
+                                    "detail": IMAGE_DETAIL
                                 }
-                            ]
-                        }
-                    ]
-                )
-                content = response.choices[0].message.content
+                            }
+                        ]
+                    }
+                ]
+            )
+            content = response.choices[0].message.content
+            if VERBOSE:
                 print(f"🖼️ [*] Extracted text from image: {filename}")
                 print(f"Extracted content: {content[:100]}...")
                 
         elif ext == '.mp3':
             # Use Whisper to transcribe audio
-            client = OpenAI(api_key=OPENAI_API_KEY)
-            with open(file_path, "rb") as audio_file:
-                transcription = client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file
-                )
-                content = transcription.text
+            content = transcribe_audio(file_path)
+            if VERBOSE:
                 print(f"🎵 [*] Transcribed audio: {filename}")
                 print(f"Transcription: {content[:100]}...")
         else:
@@ -160,121 +390,310 @@ def categorize_file(file_path, content):
         print(f"⏭️ [*] Skipping file in facts directory: {filename}")
         return None
     
-    # Placeholder for the prompt, you can replace with your own
-    system_prompt = """
-[Classify Extracted Text from Archive Files]
-
-You are an intelligence filter classifying raw extracted text into one of two categories: people-related evidence or hardware-related malfunctions.
-
-<prompt_objective>
-Label each piece of text as either `people` or `hardware` if it contains relevant information. If it does not match either category, do NOT return anything.
-</prompt_objective>
-
-<prompt_rules>
-- Return ONLY one of the following labels: `people` or `hardware`.
-- DO NOT return `no data`, `unknown`, or any other label.
-- DO NOT explain or summarize.
-- DO NOT fabricate labels for irrelevant or ambiguous input – return nothing at all in such cases.
-
-Classification criteria:
-
-**Label as `people` if the text mentions:**
-- Captured individuals, hostages, prisoners, detainees.
-- Traces of human presence such as:
-  - footprints, fingerprints, blood stains, hair, voice, handwritten notes, body temperature traces, surveillance imagery.
-- Direct or indirect indicators like: “two sets of boots”, “human heat signature”, “unidentified subject spotted”.
-
-**Label as `hardware` if the text mentions:**
-- Physical equipment malfunctions (excluding software issues).
-- Faulty machinery, broken components, overheating, short-circuits, loss of structural integrity, sensor failure.
-- Phrases like: “broken gear”, “cooling system failure”, “detected voltage spike”, “damaged rotor”, “battery leakage”, “faulty connection”.
-
-<prompt_examples>
-USER: "W miejscu zdarzenia odnaleziono dwa odciski butów oraz ręcznie zapisane notatki."
-AI: people
-
-USER: "Moduł sensoryczny przestał reagować po wykryciu anomalii w zasilaniu."
-AI: hardware
-
-USER: "Odczyt wskazuje na obecność istoty biologicznej w strefie 3."
-AI: people
-
-USER: "Kamera termowizyjna zarejestrowała ślad cieplny o ludzkim kształcie."
-AI: people
-
-USER: "Wadliwy przekaźnik spowodował spięcie i zatrzymanie całego układu."
-AI: hardware
+    categories = prefilter_categories(content)
+    if categories is not None:
+        if VERBOSE:
+            print(f"🏷️ [*] Categorized {filename} locally: {categories}")
+        return categories
+    
+    try:
+        response = openai_retry(OPENAI_CLIENT.chat.completions.create)(
+            model="gpt-4o",  # Using a smaller, faster model for cost efficiency
+            messages=build_categorization_messages(content),
+            temperature=0 # Low temperature for more consistent results
+        )
+        
+        log_prompt_cache_usage(response.usage)
+        result = response.choices[0].message.content.strip()
+        if VERBOSE:
+            print(f"🏷️ [*] Categorization result for {filename}:")
+            print(result)
+        
+        return parse_categories(result)
+        
+    except Exception as e:
+        print(f"❌ [-] Error categorizing file {filename}: {str(e)}")
+        return None
 
-USER: "Sygnał GPS został utracony na 3 godziny."
-AI:
 
-USER: "W kanałach wentylacyjnych wykryto ślady włókien organicznych i ludzkiego naskórka."
-AI: people
+def prefilter_categories(content):
+    """
+    Categorize obvious cases locally without the LLM.
+    
+    Returns [] only when the text has no keyword and no hint of either category, a single
+    category when only that one matches with at least two distinct keywords and nothing is
+    negated, and None when the LLM is needed.
+    """
+    people_hits = {match.group(0).lower() for match in PEOPLE_KEYWORDS.finditer(content)}
+    hardware_hits = {match.group(0).lower() for match in HARDWARE_KEYWORDS.finditer(content)}
+    
+    if not people_hits and not hardware_hits:
+        return None if PREFILTER_HINTS.search(content) else []
+    if NEGATION_PATTERN.search(content):
+        return None
+    if len(people_hits) >= PREFILTER_MIN_HITS and not hardware_hits:
+        return ["people"]
+    if len(hardware_hits) >= PREFILTER_MIN_HITS and not people_hits:
+        return ["hardware"]
+    return None
+
+
+def build_categorization_messages(content):
+    """Build the chat messages for classifying one file's content."""
+    return [
+        {"role": "system", "content": CATEGORIZATION_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Categorize this factory report:\n\n{content}"}
+    ]
+
+
+def parse_categories(result):
+    """Parse categories from the model's response."""
+    categories = []
+    if "people" in result.lower():
+        categories.append("people")
+    if "hardware" in result.lower():
+        categories.append("hardware")
+    return categories
 
-USER: "Drgania osi obrotu przekroczyły dopuszczalną normę, sugerując uszkodzenie łożyska."
-AI: hardware
 
-USER: "Notatki znalezione przy porzuconym obozowisku sugerują, że przebywały tam przynajmniej dwie osoby."
-AI: people
-</prompt_examples>
+def group_file_contents(file_contents):
+    """Split file contents into groups bounded by item count and total size."""
+    groups = []
+    group, group_size = {}, 0
+    for filename, content in file_contents.items():
+        if group and (len(group) >= GROUP_MAX_ITEMS or group_size + len(content) > GROUP_MAX_CHARS):
+            groups.append(group)
+            group, group_size = {}, 0
+        group[filename] = content
+        group_size += len(content)
+    if group:
+        groups.append(group)
+    return groups
+
+
+def build_group_categorization_messages(group):
+    """Build the chat messages for classifying a group of files in one request."""
+    items = "\n".join(f"[{item_id}] {content}" for item_id, content in enumerate(group.values(), 1))
+    return [
+        {"role": "system", "content": CATEGORIZATION_SYSTEM_PROMPT},
+        {"role": "user", "content": (
+            "Classify each of the factory reports below separately. Return a JSON object mapping every "
+            "item number to `people`, `hardware` or an empty string if nothing fits, "
+            f"e.g. {{\"1\": \"people\", \"2\": \"\"}}. Items:\n\n{items}"
+        )}
+    ]
+
+
+def parse_group_categories(result, group):
+    """Map the model's {item number: label} JSON back to filenames, ignoring malformed entries."""
+    try:
+        labels = json.loads(result)
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(labels, dict):
+        return {}
+    
+    filenames = list(group)
+    group_results = {}
+    for item_id, label in labels.items():
+        item_id = str(item_id).strip("[] ")
+        if item_id.isdigit() and 1 <= int(item_id) <= len(filenames) and isinstance(label, str):
+            group_results[filenames[int(item_id) - 1]] = parse_categories(label)
+    return group_results
 
-Return only: `people` or `hardware`. If nothing fits, return nothing.
 
-    """
-    
+def categorize_group(group):
+    """Categorize a group of files with a single request."""
     try:
-        client = OpenAI(api_key=OPENAI_API_KEY)
-        response = client.chat.completions.create(
-            model="gpt-4o",  # Using a smaller, faster model for cost efficiency
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Categorize this factory report:\n\n{content}"}
-            ],
-            temperature=0 # Low temperature for more consistent results
+        response = openai_retry(OPENAI_CLIENT.chat.completions.create)(
+            model="gpt-4o",
+            messages=build_group_categorization_messages(group),
+            temperature=0,
+            response_format={"type": "json_object"}
         )
         
+        log_prompt_cache_usage(response.usage)
         result = response.choices[0].message.content.strip()
-        print(f"🏷️ [*] Categorization result for {filename}:")
-        print(result)
-        
-        # Parse categories from response
-        categories = []
-        if "people" in result.lower():
-            categories.append("people")
-        if "hardware" in result.lower():
-            categories.append("hardware")
-        
-        return categories
+        if VERBOSE:
+            print(f"🏷️ [*] Categorization result for {len(group)} files: {result}")
+        return parse_group_categories(result, group)
         
     except Exception as e:
-        print(f"❌ [-] Error categorizing file {filename}: {str(e)}")
+        print(f"❌ [-] Error categorizing group of {len(group)} files: {str(e)}")
+        return {}
+
+
+def categorize_files_batch(groups):
+    """Categorize groups of files at once through the OpenAI Batch API; None if it does not complete."""
+    print(f"📦 [*] Submitting {len(groups)} groups to the Batch API...")
+    
+    # One JSONL request per group, keyed by group index so results can be mapped back
+    batch_lines = [
+        json.dumps({
+            "custom_id": f"group-{index}",
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": "gpt-4o",
+                "temperature": 0,
+                "response_format": {"type": "json_object"},
+                "messages": build_group_categorization_messages(group)
+            }
+        })
+        for index, group in enumerate(groups)
+    ]
+    batch_file = OPENAI_CLIENT.files.create(
+        file=("categorize.jsonl", "\n".join(batch_lines).encode("utf-8"), "application/jsonl"),
+        purpose="batch"
+    )
+    batch = OPENAI_CLIENT.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h"
+    )
+    
+    deadline = time.monotonic() + BATCH_MAX_WAIT
+    while batch.status not in BATCH_FINAL_STATUSES:
+        if time.monotonic() >= deadline:
+            print(f"⌛ [!] Batch {batch.id} still {batch.status} after {BATCH_MAX_WAIT} s, cancelling it")
+            try:
+                OPENAI_CLIENT.batches.cancel(batch.id)
+            except Exception as e:
+                print(f"⚠️ [!] Could not cancel batch {batch.id}: {str(e)}")
+            return None
+        print(f"⏳ [*] Batch {batch.id} is {batch.status}, waiting...")
+        time.sleep(BATCH_POLL_INTERVAL)
+        batch = OPENAI_CLIENT.batches.retrieve(batch.id)
+    
+    if batch.status != "completed" or not batch.output_file_id:
+        print(f"❌ [-] Batch {batch.id} ended with status: {batch.status}")
         return None
+    
+    results = {}
+    for line in OPENAI_CLIENT.files.content(batch.output_file_id).text.splitlines():
+        record = json.loads(line)
+        custom_id = record["custom_id"]
+        response = record.get("response") or {}
+        if record.get("error") or response.get("status_code") != 200:
+            print(f"❌ [-] Error categorizing {custom_id}: {record.get('error') or response.get('body')}")
+            continue
+        
+        result = response["body"]["choices"][0]["message"]["content"].strip()
+        if VERBOSE:
+            print(f"🏷️ [*] Categorization result for {custom_id}: {result}")
+        group = groups[int(custom_id.removeprefix("group-"))]
+        results.update(parse_group_categories(result, group))
+    
+    return results
+
+
+def load_manifest():
+    """Load the content hash -> categories manifest, dropping it if the rules have changed."""
+    try:
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    if manifest.get("rules_hash") != CATEGORIZATION_RULES_HASH:
+        print("♻️ [*] Categorization rules changed, ignoring the old manifest")
+        return {}
+    return manifest.get("entries", {})
+
+
+def save_manifest(entries):
+    """Atomically write the manifest, so an interrupted run never leaves a broken file."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_file = f"{MANIFEST_FILE}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump({"rules_hash": CATEGORIZATION_RULES_HASH, "entries": entries}, f)
+    os.replace(tmp_file, MANIFEST_FILE)
 
 
 def process_files(files):
     """Process all files and categorize them."""
     print("🔍 [*] Processing files...")
     
-    # Initialize categories
+    # Initialize categories (sets for O(1) de-duplication, sorted into lists at the end)
     categories = {
-        "people": [],
-        "hardware": []
+        "people": set(),
+        "hardware": set()
     }
     
-    # Process each file
-    for file_path in files:
-        content = get_file_content(file_path)
-        file_categories = categorize_file(file_path, content)
+    manifest = load_manifest()
+    
+    # Files are independent, so run them concurrently; results are merged here on the
+    # main thread, so the categories dict needs no lock
+    file_results = {}
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        # Files whose contents were already categorized in a previous run skip everything else
+        file_hashes = dict(zip(files, executor.map(hash_file, files)))
+        pending_files = []
+        for file_path, file_hash in file_hashes.items():
+            if file_hash in manifest:
+                file_results[os.path.basename(file_path)] = manifest[file_hash]
+            else:
+                pending_files.append(file_path)
+        print(f"📒 [*] {len(file_results)} files already categorized, {len(pending_files)} to process")
+        
+        file_contents = {
+            os.path.basename(file_path): content
+            for file_path, content in zip(
+                pending_files,
+                executor.map(lambda file_path: get_file_content(file_path, file_hashes[file_path]), pending_files)
+            )
+            if content is not None
+        }
+        unreadable_files = [os.path.basename(file_path) for file_path in pending_files
+                            if os.path.basename(file_path) not in file_contents]
+        if unreadable_files:
+            print(f"❌ [-] Could not read {len(unreadable_files)} files, they are left out of the "
+                  f"categorization and the answer may be incomplete: {', '.join(unreadable_files)}")
         
+        # Settle the obvious files locally and send only the ambiguous ones to the LLM
+        llm_contents = {}
+        for filename, content in file_contents.items():
+            file_categories = prefilter_categories(content)
+            if file_categories is None:
+                llm_contents[filename] = content
+            else:
+                file_results[filename] = file_categories
+        print(f"🔎 [*] Categorized {len(file_contents) - len(llm_contents)} files locally, {len(llm_contents)} need the LLM")
+        
+        # Classify many files per request so the long system prompt is sent once per group
+        groups = group_file_contents(llm_contents)
+        batch_results = None
+        if groups and not SYNC_MODE:
+            batch_results = categorize_files_batch(groups)
+            if batch_results is None:
+                print("🔁 [*] Falling back to synchronous categorization...")
+        if batch_results is not None:
+            file_results.update(batch_results)
+        else:
+            for group_results in executor.map(categorize_group, groups):
+                file_results.update(group_results)
+        
+        # Files the model skipped or answered malformed get a single-file retry
+        missing_files = [filename for filename in file_contents if filename not in file_results]
+        if missing_files:
+            print(f"🔁 [*] Categorizing {len(missing_files)} remaining files one by one...")
+            retried = executor.map(lambda filename: categorize_file(filename, file_contents[filename]), missing_files)
+            file_results.update(zip(missing_files, retried))
+    
+    # Remember the new results; failed files (None) are retried next run
+    for file_path in pending_files:
+        file_categories = file_results.get(os.path.basename(file_path))
+        if file_categories is not None:
+            manifest[file_hashes[file_path]] = file_categories
+    save_manifest(manifest)
+    
+    for filename, file_categories in file_results.items():
         if file_categories:
-            filename = os.path.basename(file_path)
             for category in file_categories:
-                if category in categories and filename not in categories[category]:
-                    categories[category].append(filename)
+                if category in categories:
+                    categories[category].add(filename)
     
     # Sort filenames alphabetically in each category
-    for category in categories:
-        categories[category].sort()
+    categories = {category: sorted(filenames) for category, filenames in categories.items()}
     
     print("✅ [+] File processing and categorization completed")
     return categories
@@ -301,7 +720,8 @@ def submit_categories(categories):
     )
     
     print(f"✅ [+] Submission response: {response.text}")
-    print(response)
+    if VERBOSE:
+        print(response)
     
     # Check for flag in response
     try:
@@ -319,11 +739,13 @@ def main():
     
     # Get files from directory
     files = get_files_from_directory()
-    print(files)
+    if VERBOSE:
+        print(files)
     
     # Process and categorize files
     categories = process_files(files)
-    print(files)
+    if VERBOSE:
+        print(files)
     
     # Print categorized files
     print("📋 [*] Categorized files:")
@@ -12,12 +12,10 @@ import os
 import sys
 import json
 import re
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
-# Add parent directory to Python path to allow imports from shared utils
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from utils import make_request, find_flag_in_text, ask_llm
+from utils import make_request, find_flag_in_text, ask_llm, disk_cache
 
 # Load environment variables
 load_dotenv()
@@ -27,6 +25,8 @@ API_KEY = os.getenv("API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 DATABASE_API_URL = os.getenv("DATABASE_API_URL")
 CENTRALA_REPORT_URL = os.getenv("CENTRALA_REPORT_URL")
+# The schema is stable, so it is cached on disk; pass --refresh-schema to rediscover it
+REFRESH_SCHEMA = "--refresh-schema" in sys.argv
 
 
 def execute_database_query(query):
@@ -44,7 +44,8 @@ def execute_database_query(query):
             DATABASE_API_URL,
             method="post",
             data=json.dumps(payload),
-            headers={"Content-Type": "application/json"}
+            headers={"Content-Type": "application/json"},
+            retry=True,  # read-only query, safe to repeat
         )
         
         result = response.json()
@@ -58,6 +59,21 @@ def execute_database_query(query):
         return None
 
 
+def get_table_structure(table_name):
+    """Get the CREATE TABLE statement for a single table."""
+    print(f"🔍 [*] Getting structure for table: {table_name}")
+    structure_result = execute_database_query(f"SHOW CREATE TABLE {table_name}")
+    
+    if structure_result and 'reply' in structure_result:
+        print(f"✅ [+] Got structure for {table_name}")
+        return structure_result['reply']
+    
+    print(f"❌ [-] Could not get structure for {table_name}")
+    return None
+
+
+# ttl=0 forces a fresh discovery (and rewrites the cached copy)
+@disk_cache("s03e03_schema", key_func=lambda: str(DATABASE_API_URL).encode("utf-8"), ttl=0 if REFRESH_SCHEMA else None)
 def discover_database_schema():
     """Discover the database schema by exploring tables and their structure."""
     print("🔍 [*] Discovering database schema...")
@@ -73,19 +89,20 @@ def discover_database_schema():
     tables = tables_result['reply']
     print(f"📊 [*] Found tables: {tables}")
     
-    # Get structure for each table
-    schema_info = {}
-    for table in tables:
-        table_name = table['Tables_in_banan'] if 'Tables_in_banan' in table else list(table.values())[0]
-        print(f"🔍 [*] Getting structure for table: {table_name}")
-        
-        structure_result = execute_database_query(f"SHOW CREATE TABLE {table_name}")
-        
-        if structure_result and 'reply' in structure_result:
-            schema_info[table_name] = structure_result['reply']
-            print(f"✅ [+] Got structure for {table_name}")
-        else:
-            print(f"❌ [-] Could not get structure for {table_name}")
+    table_names = [
+        table['Tables_in_banan'] if 'Tables_in_banan' in table else list(table.values())[0]
+        for table in tables
+    ]
+    
+    # Get structure for each table; the requests are independent, so send them in parallel
+    with ThreadPoolExecutor(max_workers=max(len(table_names), 1)) as executor:
+        schema_info = dict(zip(table_names, executor.map(get_table_structure, table_names)))
+    
+    # A partial schema must not be cached, so fail the whole discovery instead
+    missing = [table_name for table_name, structure in schema_info.items() if structure is None]
+    if missing:
+        print(f"❌ [-] Incomplete schema, missing structure for: {', '.join(missing)}")
+        return None
     
     return schema_info
 
@@ -158,13 +175,21 @@ def extract_datacenter_ids(query_result):
     
     print(f"📊 [*] Processing {len(results)} result rows")
     
+    if not results:
+        return []
+    
+    # Look for DC_ID or similar field names once; every row has the same columns
+    id_column = next(
+        (key for key in results[0]
+         if 'dc_id' in key.lower() or 'datacenter_id' in key.lower() or 'id' in key.lower()),
+        None
+    )
+    if id_column is None:
+        print(f"❌ [-] No ID column found in result columns: {list(results[0])}")
+        return []
+    
     for row in results:
-        # Look for DC_ID or similar field names
-        dc_id = None
-        for key, value in row.items():
-            if 'dc_id' in key.lower() or 'datacenter_id' in key.lower() or 'id' in key.lower():
-                dc_id = value
-                break
+        dc_id = row.get(id_column)
         
         if dc_id is not None:
             datacenter_ids.append(dc_id)
@@ -1,11 +1,11 @@
 import os
-import sys
 import json
 import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils import ask_llm, make_request
+from utils import ask_llm, make_request, disk_cache
 
 load_dotenv()
 # --- KONFIGURACJA ---
@@ -15,13 +15,17 @@ BARBARA_NOTE_URL = os.environ["BARBARA_NOTE_URL"]
 PEOPLE_API = os.environ["PEOPLE_API"]
 PLACES_API = os.environ["PLACES_API"]
 REPORT_API = os.environ["REPORT_API"]
+VERBOSE = os.getenv("VERBOSE") == "1"  # logi dla każdego zapytania BFS
+MAX_WORKERS = 16  # równoległe zapytania do people/places w jednym poziomie BFS
 
 # --- Pomocnicza funkcja do czyszczenia odpowiedzi LLM ---
+# Wzorce kompilowane raz przy imporcie
+JSON_FENCE_OPEN = re.compile(r"^```(?:json)?", re.IGNORECASE)
+JSON_FENCE_CLOSE = re.compile(r"```$")
+
 def extract_json_from_llm_response(llm_response):
-    llm_response = llm_response.strip()
-    llm_response = re.sub(r"^```json", "", llm_response, flags=re.IGNORECASE).strip()
-    llm_response = re.sub(r"^```", "", llm_response).strip()
-    llm_response = re.sub(r"```$", "", llm_response).strip()
+    llm_response = JSON_FENCE_OPEN.sub("", llm_response.strip()).strip()
+    llm_response = JSON_FENCE_CLOSE.sub("", llm_response).strip()
     return llm_response
 
 def normalize(s):
@@ -59,76 +63,94 @@ except Exception as e:
     exit(1)
 
 # --- 3. Normalizacja ---
-kolejka_osob = set(normalize(i) for i in imiona)
-kolejka_miast = set(normalize(m) for m in miasta)
-sprawdzone_osoby = set()
-sprawdzone_miasta = set()
+# Kolejki BFS + zbiory odwiedzonych; węzeł oznaczamy jako odwiedzony już przy
+# dodaniu do kolejki, więc nigdy nie trafi do niej drugi raz
+sprawdzone_osoby = set(normalize(i) for i in imiona)
+sprawdzone_miasta = set(normalize(m) for m in miasta)
+kolejka_osob = deque(sorted(sprawdzone_osoby))
+kolejka_miast = deque(sorted(sprawdzone_miasta))
 miasta_z_notatki = set(kolejka_miast)
 
-print(f"[INFO] Startowe imiona: {kolejka_osob}")
-print(f"[INFO] Startowe miasta: {kolejka_miast}")
+print(f"[INFO] Startowe imiona: {list(kolejka_osob)}")
+print(f"[INFO] Startowe miasta: {list(kolejka_miast)}")
 
 # --- 4. Pętla BFS ---
+# Odpowiedzi people/places są stałe, więc trzymamy je na dysku między uruchomieniami.
+# Błędy i odpowiedzi z ukrytymi danymi zwracają None, więc nie trafiają do cache
+RESTRICTED_MARKER = "RESTRICTED DATA"
+
+@disk_cache("s03e04_api")
+def zapytaj_api(url, nazwa_api, query):
+    payload = {"apikey": API_KEY, "query": query}
+    resp = make_request(url, method="post", json=payload, retry=True)  # samo wyszukiwanie, można powtórzyć
+    if not resp.ok:
+        print(f"[ERROR] {nazwa_api} zwróciło {resp.status_code} dla {query}: {resp.text}")
+        return None
+    try:
+        data = resp.json()
+    except Exception as e:
+        print(f"[ERROR] Nie udało się sparsować odpowiedzi {nazwa_api}:", e)
+        return None
+    message = data.get("message") if isinstance(data, dict) else None
+    if not isinstance(message, str) or RESTRICTED_MARKER in message:
+        print(f"[WARN] {nazwa_api} nie zwróciło wyniku dla {query}: {data}")
+        return None
+    return message.split()
+
+# BFS poziomami: wszystkie zapytania z jednego poziomu idą równolegle,
+# więc czas to ~RTT × głębokość zamiast RTT × liczba węzłów
 found = None
-while kolejka_osob or kolejka_miast:
-    # Osoby
-    if kolejka_osob:
-        osoba = kolejka_osob.pop()
-        if osoba in sprawdzone_osoby:
-            continue
-        sprawdzone_osoby.add(osoba)
-        print(f"[API/people] Sprawdzam osobę: {osoba}")
-        payload = {"apikey": API_KEY, "query": osoba}
-        resp = make_request(PEOPLE_API, method="post", json=payload)
-        try:
-            data = resp.json()
-            if isinstance(data, dict) and "message" in data:
-                miejsca = data["message"].split()
-            else:
-                miejsca = data
-        except Exception as e:
-            print("[ERROR] Nie udało się sparsować odpowiedzi people:", e)
-            continue
-        print(f"[API/people] {osoba} widziano w: {miejsca}")
-        for m in miejsca:
-            m_norm = normalize(m)
-            if is_valid_name(m_norm):
-                if m_norm not in sprawdzone_miasta:
-                    kolejka_miast.add(m_norm)
-            else:
-                print(f"[WARN] Pomijam nietypową nazwę miasta: {m_norm}")
-    # Miasta
-    if kolejka_miast:
-        miasto = kolejka_miast.pop()
-        if miasto in sprawdzone_miasta:
-            continue
-        sprawdzone_miasta.add(miasto)
-        print(f"[API/places] Sprawdzam miasto: {miasto}")
-        payload = {"apikey": API_KEY, "query": miasto}
-        resp = make_request(PLACES_API, method="post", json=payload)
-        try:
-            data = resp.json()
-            if isinstance(data, dict) and "message" in data:
-                osoby = data["message"].split()
-            else:
-                osoby = data
-        except Exception as e:
-            print("[ERROR] Nie udało się sparsować odpowiedzi places:", e)
-            continue
-        print(f"[API/places] W {miasto} widziano: {osoby}")
-        for o in osoby:
-            o_norm = normalize(o)
-            if is_valid_name(o_norm):
-                if o_norm not in sprawdzone_osoby:
-                    kolejka_osob.add(o_norm)
-            else:
-                print(f"[WARN] Pomijam nietypowe imię: {o_norm}")
-        # Szukamy Barbary
-        # if "BARBARA" in [normalize(x) for x in osoby]:
-        #     if miasto not in miasta_z_notatki:
-        #         print(f"[ODPOWIEDŹ] Barbara może być w: {miasto}")
-        #         found = miasto
-        #         break
+with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+    while kolejka_osob or kolejka_miast:
+        # Zamrażamy bieżący poziom; nowe nazwy trafiają do kolejek następnego poziomu
+        osoby_poziomu = list(kolejka_osob)
+        miasta_poziomu = list(kolejka_miast)
+        kolejka_osob.clear()
+        kolejka_miast.clear()
+
+        print(f"[INFO] Poziom BFS: {len(osoby_poziomu)} osób, {len(miasta_poziomu)} miast")
+        if VERBOSE:
+            for osoba in osoby_poziomu:
+                print(f"[API/people] Sprawdzam osobę: {osoba}")
+            for miasto in miasta_poziomu:
+                print(f"[API/places] Sprawdzam miasto: {miasto}")
+        wyniki_osob = executor.map(lambda osoba: zapytaj_api(PEOPLE_API, "people", osoba), osoby_poziomu)
+        wyniki_miast = executor.map(lambda miasto: zapytaj_api(PLACES_API, "places", miasto), miasta_poziomu)
+
+        # Osoby
+        for osoba, miejsca in zip(osoby_poziomu, wyniki_osob):
+            if miejsca is None:
+                continue
+            if VERBOSE:
+                print(f"[API/people] {osoba} widziano w: {miejsca}")
+            for m in miejsca:
+                m_norm = normalize(m)
+                if is_valid_name(m_norm):
+                    if m_norm not in sprawdzone_miasta:
+                        sprawdzone_miasta.add(m_norm)
+                        kolejka_miast.append(m_norm)
+                else:
+                    print(f"[WARN] Pomijam nietypową nazwę miasta: {m_norm}")
+        # Miasta
+        for miasto, osoby in zip(miasta_poziomu, wyniki_miast):
+            if osoby is None:
+                continue
+            if VERBOSE:
+                print(f"[API/places] W {miasto} widziano: {osoby}")
+            for o in osoby:
+                o_norm = normalize(o)
+                if is_valid_name(o_norm):
+                    if o_norm not in sprawdzone_osoby:
+                        sprawdzone_osoby.add(o_norm)
+                        kolejka_osob.append(o_norm)
+                else:
+                    print(f"[WARN] Pomijam nietypowe imię: {o_norm}")
+            # Szukamy Barbary
+            # if "BARBARA" in [normalize(x) for x in osoby]:
+            #     if miasto not in miasta_z_notatki:
+            #         print(f"[ODPOWIEDŹ] Barbara może być w: {miasto}")
+            #         found = miasto
+            #         break
 
 # --- 5. Raportowanie ---
 if found:
@@ -13,17 +13,19 @@ import sys
 import json
 import re
 import base64
-import requests
+import io
+import asyncio
 from dotenv import load_dotenv
-from openai import OpenAI
-
-# Add parent directory to Python path to allow imports from shared utils
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from openai import AsyncOpenAI, BadRequestError
+from PIL import Image
 
 from utils import (
-    make_request,
     ask_llm,
     find_flag_in_text,
+    make_request,
+    async_make_request,
+    close_async_session,
+    disk_cache,
 )
 
 # Load environment variables
@@ -34,8 +36,22 @@ API_KEY = os.getenv("API_KEY")
 CENTRALA_REPORT_URL = os.getenv("CENTRALA_REPORT_URL")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+# Inlined photos only feed the low-detail checks, which see at most 512x512 anyway
+VISION_MAX_EDGE = 512
+JPEG_QUALITY = 85
+
+# One client for the whole run so the concurrent photo pipelines share its connection pool
+OPENAI_CLIENT = AsyncOpenAI(api_key=OPENAI_API_KEY)
+
+PHOTO_URL_PATTERN = re.compile(r'https://[^\s\'"<>]+\.(?:png|jpg|jpeg|gif|webp)', re.IGNORECASE)
+BASE_URL_PATTERN = re.compile(r'https://[^\s\'"<>]+/')
+PHOTO_FILENAME_PATTERN = re.compile(r'(IMG_\d+[A-Z_]*\.PNG)', re.IGNORECASE)
+
+# Data URIs of photos already downloaded this run, keyed by URL
+_IMAGE_DATA_CACHE = {}
 
-def start_photo_session():
+
+async def start_photo_session():
     """Initiate communication with the photo processing automation system."""
     print("🚀 [*] Starting photo processing session...")
     
@@ -46,17 +62,18 @@ def start_photo_session():
     }
     
     try:
-        response = make_request(
+        response = await async_make_request(
             CENTRALA_REPORT_URL,
             method="post",
             data=json.dumps(payload),
             headers={"Content-Type": "application/json"}
         )
+        response_text = await response.text()
         
         print(f"✅ [+] Session started successfully")
-        print(f"📋 [*] Response: {response.text}")
+        print(f"📋 [*] Response: {response_text}")
         
-        result = response.json()
+        result = json.loads(response_text)
         return result
     
     except Exception as e:
@@ -69,8 +86,7 @@ def extract_photo_urls(response_text):
     print("🔍 [*] Extracting photo URLs from response...")
     
     # First, look for complete URLs in the response text
-    url_pattern = r'https://[^\s\'"<>]+\.(?:png|jpg|jpeg|gif|webp)'
-    urls = re.findall(url_pattern, response_text, re.IGNORECASE)
+    urls = PHOTO_URL_PATTERN.findall(response_text)
     
     if urls:
         print(f"✅ [+] Found {len(urls)} complete photo URLs:")
@@ -79,11 +95,8 @@ def extract_photo_urls(response_text):
         return urls
     
     # If no complete URLs found, look for filenames and base URL separately
-    base_url_pattern = r'https://[^\s\'"<>]+/'
-    base_urls = re.findall(base_url_pattern, response_text)
-    
-    filename_pattern = r'(IMG_\d+[A-Z_]*\.PNG)'
-    filenames = re.findall(filename_pattern, response_text, re.IGNORECASE)
+    base_urls = BASE_URL_PATTERN.findall(response_text)
+    filenames = PHOTO_FILENAME_PATTERN.findall(response_text)
     
     if base_urls and filenames:
         base_url = base_urls[0]  # Use the first base URL found
@@ -103,51 +116,81 @@ def extract_filename_from_url(url):
     return url.split('/')[-1]
 
 
-def download_image_as_base64(image_url):
+def _preprocess_for_vision(image_bytes):
+    """Downscale an image to what the vision checks use and re-encode it as JPEG."""
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        image = image.convert("RGB")
+        image.thumbnail((VISION_MAX_EDGE, VISION_MAX_EDGE), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=JPEG_QUALITY, optimize=True)
+    return buffer.getvalue(), "image/jpeg"
+
+
+async def download_image_as_base64(image_url):
     """Download image from URL and convert to base64."""
+    # Every processed version gets a new URL, so a URL always names the same image
+    if image_url in _IMAGE_DATA_CACHE:
+        return _IMAGE_DATA_CACHE[image_url]
+    
     print(f"📥 [*] Downloading image: {extract_filename_from_url(image_url)}")
     
     try:
-        response = requests.get(image_url)
+        response = await async_make_request(image_url)
         response.raise_for_status()
         
-        # Convert to base64
-        image_base64 = base64.b64encode(response.content).decode('utf-8')
+        # The response keeps its body alive; hold only the bytes from here on
+        image_bytes = await response.read()
+        del response
         
-        # Determine image type from URL
-        if image_url.lower().endswith('.png'):
-            mime_type = "image/png"
-        elif image_url.lower().endswith('.jpg') or image_url.lower().endswith('.jpeg'):
-            mime_type = "image/jpeg"
-        elif image_url.lower().endswith('.gif'):
-            mime_type = "image/gif"
-        elif image_url.lower().endswith('.webp'):
-            mime_type = "image/webp"
-        else:
-            mime_type = "image/png"  # default
+        # Shrink and re-encode before base64 (off the event loop, Pillow is CPU-bound)
+        jpeg_bytes, mime_type = await asyncio.to_thread(_preprocess_for_vision, image_bytes)
+        # Drop the raw download before encoding, so it and the base64 copy are never alive together
+        del image_bytes
+        image_base64 = base64.b64encode(jpeg_bytes).decode('ascii')
+        del jpeg_bytes
         
         print(f"✅ [+] Image downloaded and converted to base64")
-        return f"data:{mime_type};base64,{image_base64}"
+        image_data = f"data:{mime_type};base64,{image_base64}"
+        _IMAGE_DATA_CACHE[image_url] = image_data
+        return image_data
     
     except Exception as e:
         print(f"❌ [-] Error downloading image: {str(e)}")
         return None
 
 
-def analyze_photo_quality_with_vision(photo_url):
-    """Analyze photo quality using OpenAI vision with base64 image data."""
+# A photo URL always names the same image, so the request (prompt + URL) fully determines the
+# answer; reruns and repeated checks of the same photo reuse it instead of asking again
+@disk_cache("s04e01_vision")
+async def ask_vision_model(image_part, **kwargs):
+    """Run a gpt-4o vision request by image URL and return the reply text.
+
+    Retries with the image inlined as base64 if OpenAI can't fetch the URL.
+    """
+    try:
+        response = await OPENAI_CLIENT.chat.completions.create(model="gpt-4o", **kwargs)
+    except BadRequestError as e:
+        image_url = image_part["image_url"]["url"]
+        print(f"⚠️ [!] OpenAI could not fetch {extract_filename_from_url(image_url)} ({str(e)}), sending it inline")
+        image_data = await download_image_as_base64(image_url)
+        if not image_data:
+            raise
+        image_part["image_url"]["url"] = image_data
+        response = await OPENAI_CLIENT.chat.completions.create(model="gpt-4o", **kwargs)
+    return response.choices[0].message.content
+
+
+async def analyze_photo_quality_with_vision(photo_url):
+    """Analyze photo quality using OpenAI vision."""
     print(f"🔍 [*] Analyzing photo quality: {extract_filename_from_url(photo_url)}")
     
-    # Download image as base64
-    image_data = download_image_as_base64(photo_url)
-    if not image_data:
-        return "GOOD"
-    
-    client = OpenAI(api_key=OPENAI_API_KEY)
+    # OpenAI fetches the photo itself; it is only downloaded and inlined if that fails.
+    # The answer is a coarse label, so the fixed-cost low-detail view is used
+    image_part = {"type": "image_url", "image_url": {"url": photo_url, "detail": "low"}}
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
+        reply = await ask_vision_model(
+            image_part,
             messages=[
                 {
                     "role": "system",
@@ -172,12 +215,7 @@ Jeśli zdjęcie jest w miarę dobrej jakości - wybierz GOOD."""
                             "type": "text",
                             "text": "Przeanalizuj jakość tego zdjęcia i określ potrzebną operację."
                         },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": image_data
-                            }
-                        }
+                        image_part
                     ]
                 }
             ],
@@ -185,7 +223,7 @@ Jeśli zdjęcie jest w miarę dobrej jakości - wybierz GOOD."""
         )
         
         # Extract the operation from response
-        operation = response.choices[0].message.content.strip().upper()
+        operation = reply.strip().upper()
         if operation not in ["REPAIR", "DARKEN", "BRIGHTEN", "GOOD"]:
             print(f"⚠️ [!] Unexpected response: {operation}, defaulting to GOOD")
             operation = "GOOD"
@@ -198,7 +236,7 @@ Jeśli zdjęcie jest w miarę dobrej jakości - wybierz GOOD."""
         return "GOOD"
 
 
-def send_command_to_automation(command):
+async def send_command_to_automation(command):
     """Send a processing command to the automation system."""
     print(f"🤖 [*] Sending command: {command}")
     
@@ -209,17 +247,18 @@ def send_command_to_automation(command):
     }
     
     try:
-        response = make_request(
+        response = await async_make_request(
             CENTRALA_REPORT_URL,
             method="post",
             data=json.dumps(payload),
             headers={"Content-Type": "application/json"}
         )
+        response_text = await response.text()
         
         print(f"✅ [+] Command sent successfully")
-        print(f"📋 [*] Response: {response.text}")
+        print(f"📋 [*] Response: {response_text}")
         
-        result = response.json()
+        result = json.loads(response_text)
         return result
     
     except Exception as e:
@@ -232,8 +271,7 @@ def extract_processed_photo_url(response_text, original_filename):
     print(f"🔍 [*] Looking for processed photo URL in response...")
     
     # First, look for complete URLs in the response
-    url_pattern = r'https://[^\s\'"<>]+\.(?:png|jpg|jpeg|gif|webp)'
-    urls = re.findall(url_pattern, response_text, re.IGNORECASE)
+    urls = PHOTO_URL_PATTERN.findall(response_text)
     
     # Look for a URL that seems to be a processed version of the original
     base_name = original_filename.split('.')[0]
@@ -271,7 +309,7 @@ def extract_processed_photo_url(response_text, original_filename):
     return None
 
 
-def process_single_photo(photo_url, max_iterations=3):
+async def process_single_photo(photo_url, max_iterations=3):
     """Process a single photo through multiple improvement iterations."""
     print(f"\n📸 [*] Processing photo: {extract_filename_from_url(photo_url)}")
     
@@ -284,7 +322,7 @@ def process_single_photo(photo_url, max_iterations=3):
         print(f"\n🔄 [*] Iteration {iteration}/{max_iterations}")
         
         # Analyze current photo quality using vision
-        operation = analyze_photo_quality_with_vision(current_url)
+        operation = await analyze_photo_quality_with_vision(current_url)
         
         if operation == "GOOD":
             print(f"✅ [+] Photo is good quality, stopping processing")
@@ -292,7 +330,7 @@ def process_single_photo(photo_url, max_iterations=3):
         
         # Send command to automation system
         command = f"{operation} {current_filename}"
-        response = send_command_to_automation(command)
+        response = await send_command_to_automation(command)
         
         if not response:
             print(f"❌ [-] Failed to process photo, stopping")
@@ -312,20 +350,17 @@ def process_single_photo(photo_url, max_iterations=3):
     return current_url
 
 
-def check_if_photo_shows_barbara_with_vision(photo_url):
-    """Check if the photo shows Barbara using OpenAI vision with base64 image data."""
+async def check_if_photo_shows_barbara_with_vision(photo_url):
+    """Check if the photo shows Barbara using OpenAI vision."""
     print(f"👤 [*] Checking if photo shows Barbara: {extract_filename_from_url(photo_url)}")
     
-    # Download image as base64
-    image_data = download_image_as_base64(photo_url)
-    if not image_data:
-        return False
-    
-    client = OpenAI(api_key=OPENAI_API_KEY)
+    # OpenAI fetches the photo itself; it is only downloaded and inlined if that fails.
+    # The answer is a coarse label, so the fixed-cost low-detail view is used
+    image_part = {"type": "image_url", "image_url": {"url": photo_url, "detail": "low"}}
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
+        reply = await ask_vision_model(
+            image_part,
             messages=[
                 {
                     "role": "system",
@@ -343,19 +378,14 @@ NIE - jeśli zdjęcie nie przedstawia osoby, jest nieczytelne, pokazuje tylko pr
                             "type": "text",
                             "text": "Czy na tym zdjęciu widać osobę (kobietę)?"
                         },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": image_data
-                            }
-                        }
+                        image_part
                     ]
                 }
             ],
             max_tokens=10
         )
         
-        shows_person = "TAK" in response.choices[0].message.content.upper()
+        shows_person = "TAK" in reply.upper()
         print(f"✅ [+] Shows person: {'Yes' if shows_person else 'No'}")
         return shows_person
     
@@ -364,12 +394,10 @@ NIE - jeśli zdjęcie nie przedstawia osoby, jest nieczytelne, pokazuje tylko pr
         return False
 
 
-def generate_barbara_portrait_with_vision(photo_urls):
+async def generate_barbara_portrait_with_vision(photo_urls):
     """Generate detailed portrait description of Barbara using OpenAI vision with small image URLs."""
     print(f"\n🎨 [*] Generating Barbara's portrait from {len(photo_urls)} photos...")
     
-    client = OpenAI(api_key=OPENAI_API_KEY)
-    
     # Prepare message content with small images (using -small suffix)
     message_content = [
         {
@@ -388,12 +416,13 @@ def generate_barbara_portrait_with_vision(photo_urls):
         message_content.append({
             "type": "image_url",
             "image_url": {
-                "url": small_url
+                "url": small_url,
+                "detail": "high"
             }
         })
     
     try:
-        response = client.chat.completions.create(
+        response = await OPENAI_CLIENT.chat.completions.create(
             model="gpt-4o",
             messages=[
                 {
@@ -443,9 +472,10 @@ def submit_portrait(portrait):
     print(payload)
     
     try:
-        # Use requests directly to match the curl format exactly
-        response = requests.post(
+        # Same body and headers as the curl call, sent over the shared keep-alive session
+        response = make_request(
             CENTRALA_REPORT_URL,
+            method="post",
             headers={"Content-Type": "application/json; charset=utf-8"},
             json=payload
         )
@@ -468,12 +498,19 @@ def submit_portrait(portrait):
         return None
 
 
-def main():
-    """Main execution function."""
-    print("🚀 [*] Starting Photos task...")
+async def process_and_check_photo(photo_url):
+    """Improve one photo, then check whether the result shows Barbara."""
+    processed_url = await process_single_photo(photo_url)
     
+    # Check if this photo shows Barbara using vision
+    shows_barbara = await check_if_photo_shows_barbara_with_vision(processed_url)
+    return processed_url, shows_barbara
+
+
+async def run_photos_task():
+    """Run the whole photo pipeline."""
     # Step 1: Start photo session
-    initial_response = start_photo_session()
+    initial_response = await start_photo_session()
     if not initial_response:
         print("❌ [-] Could not start photo session")
         sys.exit(1)
@@ -484,18 +521,10 @@ def main():
         print("❌ [-] No photo URLs found")
         sys.exit(1)
     
-    # Step 3: Process each photo
-    processed_photos = []
-    barbara_photos = []
-    
-    for photo_url in photo_urls:
-        print(f"\n{'='*60}")
-        processed_url = process_single_photo(photo_url)
-        processed_photos.append(processed_url)
-        
-        # Check if this photo shows Barbara using vision
-        if check_if_photo_shows_barbara_with_vision(processed_url):
-            barbara_photos.append(processed_url)
+    # Step 3: Process each photo; the photos are independent, so their pipelines run concurrently
+    results = await asyncio.gather(*[process_and_check_photo(photo_url) for photo_url in photo_urls])
+    processed_photos = [processed_url for processed_url, _ in results]
+    barbara_photos = [processed_url for processed_url, shows_barbara in results if shows_barbara]
     
     print(f"\n📊 [*] Processing summary:")
     print(f"    Total photos processed: {len(processed_photos)}")
@@ -506,7 +535,7 @@ def main():
         sys.exit(1)
     
     # Step 4: Generate Barbara's portrait using vision
-    portrait = generate_barbara_portrait_with_vision(barbara_photos)
+    portrait = await generate_barbara_portrait_with_vision(barbara_photos)
     if not portrait:
         print("❌ [-] Could not generate portrait")
         sys.exit(1)
@@ -517,5 +546,15 @@ def main():
     print("✅ [+] Photos task completed successfully!")
 
 
+async def main():
+    """Main execution function."""
+    print("🚀 [*] Starting Photos task...")
+    
+    try:
+        await run_photos_task()
+    finally:
+        await close_async_session()
+
+
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
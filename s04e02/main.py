@@ -10,12 +10,10 @@ This script:
 import os
 import sys
 import json
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from openai import OpenAI
 
-# Add parent directory to Python path to allow imports from shared utils
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from utils import (
     make_request,
     find_flag_in_text
@@ -29,17 +27,21 @@ API_KEY = os.getenv("API_KEY")
 CENTRALA_REPORT_URL = os.getenv("CENTRALA_REPORT_URL")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 FINE_TUNED_MODEL = os.getenv("FINE_TUNED_MODEL")  # e.g., "ft:gpt-4o-mini-2024-07-18:organization:suffix:id"
+MAX_WORKERS = 8
+VERBOSE = os.getenv("VERBOSE") == "1"  # dump intermediate data for debugging
+
+# Shared by all validation threads so they reuse one connection pool
+OPENAI_CLIENT = OpenAI(api_key=OPENAI_API_KEY)
 
 
-def load_data_files():
-    """Load the lab data files from the data directory."""
+def load_data_files(file_names):
+    """Load the given lab data files from the data directory."""
     print("📂 [*] Loading lab data files...")
     
     script_dir = os.path.dirname(os.path.abspath(__file__))
     data_dir = os.path.join(script_dir, "data")
     
     files = {}
-    file_names = ["correct.txt", "incorrect.txt", "verify.txt"]
     
     for file_name in file_names:
         file_path = os.path.join(data_dir, file_name)
@@ -49,8 +51,9 @@ def load_data_files():
             return None
         
         try:
+            # Iterate the file object so the whole file is never held as a second list of lines
             with open(file_path, 'r', encoding='utf-8') as f:
-                lines = [line.strip() for line in f.readlines() if line.strip()]
+                lines = [stripped for stripped in (line.strip() for line in f) if stripped]
             
             files[file_name.replace('.txt', '')] = lines
             print(f"✅ [+] Loaded {file_name}: {len(lines)} records")
@@ -70,12 +73,10 @@ def extract_record_id(line):
     return None
 
 
-def validate_with_fine_tuned_model(data_line):
+def validate_with_fine_tuned_model(data_line, client=OPENAI_CLIENT):
     """Validate a single data line using the fine-tuned model."""
     print(f"🔍 [*] Validating record: {extract_record_id(data_line)}")
     
-    client = OpenAI(api_key=OPENAI_API_KEY)
-    
     try:
         response = client.chat.completions.create(
             model=FINE_TUNED_MODEL,
@@ -106,16 +107,19 @@ def verify_all_records(verify_data):
     valid_ids = []
     invalid_ids = []
     
+    records = []
     for i, line in enumerate(verify_data, 1):
         record_id = extract_record_id(line)
         if not record_id:
             print(f"⚠️ [!] Could not extract ID from line {i}: {line[:50]}...")
             continue
-        
-        print(f"\n📊 [*] Processing {i}/{len(verify_data)} - ID: {record_id}")
-        
-        is_valid = validate_with_fine_tuned_model(line)
-        
+        records.append((record_id, line))
+    
+    # Records are validated independently, so send the requests concurrently; map keeps file order
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        results = list(executor.map(validate_with_fine_tuned_model, [line for _, line in records]))
+    
+    for (record_id, _), is_valid in zip(records, results):
         if is_valid:
             valid_ids.append(record_id)
             print(f"✅ [+] Record {record_id}: VALID")
@@ -207,14 +211,19 @@ def main():
     
     print(f"🤖 [*] Using fine-tuned model: {FINE_TUNED_MODEL}")
     
-    # Step 1: Load data files
-    data_files = load_data_files()
+    # Step 1: Load data files; the training files are only needed for the optional analysis
+    file_names = ["verify.txt"]
+    if VERBOSE:
+        file_names = ["correct.txt", "incorrect.txt"] + file_names
+    
+    data_files = load_data_files(file_names)
     if not data_files:
         print("❌ [-] Could not load data files")
         sys.exit(1)
     
     # Step 2: Analyze training data (optional)
-    analyze_training_data(data_files)
+    if VERBOSE:
+        analyze_training_data(data_files)
     
     # Step 3: Verify records using fine-tuned model
     verify_data = data_files.get('verify', [])
@@ -20,72 +20,64 @@ def prepare_training_data():
     # Load correct data
     correct_file = os.path.join(data_dir, "correct.txt")
     incorrect_file = os.path.join(data_dir, "incorrect.txt")
+    output_file = os.path.join(script_dir, "training_data.jsonl")
     
-    training_data = []
-    
-    # Process correct data
-    try:
-        with open(correct_file, 'r', encoding='utf-8') as f:
-            correct_lines = [line.strip() for line in f.readlines() if line.strip()]
-        
-        print(f"✅ [+] Loaded {len(correct_lines)} correct samples")
-        
-        for line in correct_lines:
-            training_example = {
-                "messages": [
-                    {"role": "system", "content": "validate data"},
-                    {"role": "user", "content": line},
-                    {"role": "assistant", "content": "1"}
-                ]
-            }
-            training_data.append(training_example)
-    
-    except Exception as e:
-        print(f"❌ [-] Error loading correct data: {str(e)}")
-        return
+    # Examples are written as soon as they are built; only counts and a few samples are kept.
+    # The file is written under a temporary name and only replaces the old one once complete
+    temp_file = output_file + ".tmp"
+    counts = {}
+    sample_examples = []
     
-    # Process incorrect data
     try:
-        with open(incorrect_file, 'r', encoding='utf-8') as f:
-            incorrect_lines = [line.strip() for line in f.readlines() if line.strip()]
+        with open(temp_file, 'w', encoding='utf-8') as out_f:
+            for name, input_file, label in (("correct", correct_file, "1"), ("incorrect", incorrect_file, "0")):
+                try:
+                    count = 0
+                    with open(input_file, 'r', encoding='utf-8') as f:
+                        for line in f:
+                            line = line.strip()
+                            if not line:
+                                continue
+                            
+                            training_example = {
+                                "messages": [
+                                    {"role": "system", "content": "validate data"},
+                                    {"role": "user", "content": line},
+                                    {"role": "assistant", "content": label}
+                                ]
+                            }
+                            out_f.write(json.dumps(training_example, ensure_ascii=False) + '\n')
+                            count += 1
+                            if len(sample_examples) < 3:
+                                sample_examples.append(training_example)
+                    
+                    counts[name] = count
+                    print(f"✅ [+] Loaded {count} {name} samples")
+                
+                except Exception as e:
+                    print(f"❌ [-] Error loading {name} data: {str(e)}")
+                    return
         
-        print(f"✅ [+] Loaded {len(incorrect_lines)} incorrect samples")
+        os.replace(temp_file, output_file)
         
-        for line in incorrect_lines:
-            training_example = {
-                "messages": [
-                    {"role": "system", "content": "validate data"},
-                    {"role": "user", "content": line},
-                    {"role": "assistant", "content": "0"}
-                ]
-            }
-            training_data.append(training_example)
-    
-    except Exception as e:
-        print(f"❌ [-] Error loading incorrect data: {str(e)}")
-        return
-    
-    # Save training data as JSONL
-    output_file = os.path.join(script_dir, "training_data.jsonl")
-    
-    try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            for example in training_data:
-                f.write(json.dumps(example, ensure_ascii=False) + '\n')
-        
-        print(f"✅ [+] Saved {len(training_data)} training examples to: {output_file}")
+        total = sum(counts.values())
+        print(f"✅ [+] Saved {total} training examples to: {output_file}")
         print(f"📊 [*] Training data summary:")
-        print(f"    Total examples: {len(training_data)}")
-        print(f"    Correct examples: {len(correct_lines)}")
-        print(f"    Incorrect examples: {len(incorrect_lines)}")
+        print(f"    Total examples: {total}")
+        print(f"    Correct examples: {counts['correct']}")
+        print(f"    Incorrect examples: {counts['incorrect']}")
         
         # Show first few examples
         print(f"\n📋 [*] Sample training examples:")
-        for i, example in enumerate(training_data[:3]):
+        for i, example in enumerate(sample_examples):
             print(f"Example {i+1}: {json.dumps(example, ensure_ascii=False)}")
     
     except Exception as e:
         print(f"❌ [-] Error saving training data: {str(e)}")
+    
+    finally:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
 
 
 if __name__ == "__main__":
@@ -18,9 +18,6 @@ from bs4 import BeautifulSoup
 import html2text
 from dotenv import load_dotenv
 
-# Add parent directory to Python path to allow imports from shared utils
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from utils import (
     make_request,
     ask_llm,
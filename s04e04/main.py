@@ -9,7 +9,6 @@ This script:
 5. Provides endpoint to register webhook URL with centrala
 """
 import os
-import sys
 import json
 from typing import Dict, Tuple, Optional
 from fastapi import FastAPI, HTTPException
@@ -18,9 +17,6 @@ from pydantic import BaseModel
 import uvicorn
 from dotenv import load_dotenv
 
-# Add parent directory to Python path to allow imports from shared utils
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from utils import (
     make_request,
     ask_llm,
@@ -11,9 +11,6 @@ import sys
 import requests
 from dotenv import load_dotenv
 
-# Add parent directory to Python path to allow imports from shared utils
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from utils import (
     make_request,
     find_flag_in_text
@@ -52,7 +49,9 @@ def register_webhook_url(webhook_url: str):
             CENTRALA_REPORT_URL,
             method="post",
             json=payload,
-            headers={"Content-Type": "application/json; charset=utf-8"}
+            headers={"Content-Type": "application/json; charset=utf-8"},
+            # Centrala tests the webhook several times before it answers, which can take minutes
+            timeout=None,
         )
         
         print(f"✅ [+] Registration successful!")
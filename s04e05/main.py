@@ -11,7 +11,6 @@ This script:
 7. Submits answers in the required JSON format
 """
 import os
-import sys
 import json
 import tempfile
 from typing import Dict, List, Optional
@@ -19,9 +18,6 @@ from dotenv import load_dotenv
 import fitz  # PyMuPDF
 from openai import OpenAI
 
-# Add parent directory to Python path to allow imports from shared utils
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from utils import (
     make_request,
     ask_llm,
@@ -7,11 +7,7 @@ with additional context and hints for better decision making.
 import json
 import requests
 from typing import Dict, Any, Optional
-import sys
-import os
 
-# Add parent directory to path for utils
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils import make_request
 
 
@@ -11,15 +11,11 @@ This script:
 7. Submits answers to centrala
 """
 import os
-import sys
 import json
 import glob
 from typing import Dict, List, Optional
 from dotenv import load_dotenv
 
-# Add parent directory to Python path for utils
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from utils import make_request, ask_llm, find_flag_in_text
 
 # Load environment variables
@@ -16,9 +16,6 @@ import json
 from typing import Dict, List, Tuple, Optional
 from dotenv import load_dotenv
 
-# Add parent directory to Python path for utils
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from utils import make_request, ask_llm, find_flag_in_text
 
 # Load environment variables
@@ -157,7 +154,8 @@ def get_people_in_location(location: str) -> List[str]:
             PLACES_API_URL,
             method="post",
             json=payload,
-            headers={"Content-Type": "application/json"}
+            headers={"Content-Type": "application/json"},
+            retry=True,  # read-only lookup, safe to repeat
         )
         
         result = response.json()
@@ -196,7 +194,8 @@ def execute_database_query(query: str) -> Dict:
             DATABASE_API_URL,
             method="post",
             json=payload,
-            headers={"Content-Type": "application/json"}
+            headers={"Content-Type": "application/json"},
+            retry=True,  # read-only lookup, safe to repeat
         )
         
         result = response.json()
@@ -257,7 +256,8 @@ def get_gps_coordinates(user_id: int) -> Optional[Tuple[float, float]]:
             GPS_API_URL,
             method="post",
             json=payload,
-            headers={"Content-Type": "application/json"}
+            headers={"Content-Type": "application/json"},
+            retry=True,  # read-only lookup, safe to repeat
         )
         
         result = response.json()
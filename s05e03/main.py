@@ -16,9 +16,6 @@ from typing import Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 from concurrent.futures import ThreadPoolExecutor
 
-# Add parent directory to Python path for utils
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from utils import make_request, ask_llm, find_flag_in_text
 
 # Load environment variables
@@ -3,7 +3,6 @@ S05E04: Serce - Robot Heart Verification API
 Minimal implementation with comprehensive logging
 """
 import os
-import sys
 import json
 import base64
 import requests
@@ -14,8 +13,6 @@ import uvicorn
 from dotenv import load_dotenv
 from io import BytesIO
 
-# Utils
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils import make_request, ask_llm, find_flag_in_text
 
 # Environment
@@ -1,12 +1,19 @@
 from .ai import ask_llm
+from .cache import LLMCache, llm_cache, disk_cache
 from .html import extract_question
 from .text import find_flag_in_text, prepare_text_for_search
-from .http import make_request
+from .http import make_request, make_submitter, async_make_request, close_async_session
 
 __all__ = [
     'ask_llm',
+    'LLMCache',
+    'llm_cache',
+    'disk_cache',
     'extract_question',
     'find_flag_in_text',
     'prepare_text_for_search',
     'make_request',
+    'make_submitter',
+    'async_make_request',
+    'close_async_session',
 ]
@@ -1,14 +1,52 @@
+from functools import lru_cache
+
+import httpx
+import openai
 from openai import OpenAI
+from openai.types import CompletionUsage
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+
+from .cache import llm_cache
 
 DEFAULT_CONTEXT = "Answer questions precisely and concisely. Provide very short responses with only necessary data."
 
-def ask_llm(question: str, api_key: str, model: str = "gpt-4o", context: str = DEFAULT_CONTEXT) -> str:
-    client = OpenAI(api_key=api_key)
+# Backoff for rate limits (429), dropped connections and 5xx when calling OpenAI from worker threads
+openai_retry = retry(
+    retry=retry_if_exception_type((openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)),
+    wait=wait_exponential(multiplier=1, max=20),
+    stop=stop_after_attempt(3),
+    reraise=True,
+)
+
+@lru_cache(maxsize=None)
+def get_openai_client(api_key: str) -> OpenAI:
+    # One client per API key so every call reuses the same keep-alive connection pool
+    return OpenAI(api_key=api_key, http_client=httpx.Client(limits=httpx.Limits(max_keepalive_connections=10)))
+
+def ask_llm(question: str, api_key: str, model: str = "gpt-4o", context: str = DEFAULT_CONTEXT, temperature: float = 0) -> str:
+    messages = [
+        {"role": "system", "content": context},
+        {"role": "user", "content": question},
+    ]
+    # temperature=0 keeps answers deterministic, which makes them safe to cache
+    cache_key = llm_cache.make_key(model, messages, temperature)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    client = get_openai_client(api_key)
     response = client.chat.completions.create(
         model=model,
-        messages=[
-            {"role": "system", "content": context},
-            {"role": "user", "content": question},
-        ]
+        messages=messages,
+        temperature=temperature,
     )
-    return response.choices[0].message.content.strip()
+    log_prompt_cache_usage(response.usage)
+    answer = response.choices[0].message.content.strip()
+    llm_cache.set(cache_key, answer)
+    return answer
+
+def log_prompt_cache_usage(usage: CompletionUsage) -> None:
+    # OpenAI caches identical prompt prefixes of 1024+ tokens; report how much of the prompt was served from it
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = getattr(details, "cached_tokens", 0) or 0
+    print(f"💾 [*] Prompt cache: {cached_tokens}/{usage.prompt_tokens} prompt tokens cached")
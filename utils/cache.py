@@ -0,0 +1,100 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", ".llmcache")
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+VERBOSE = os.getenv("VERBOSE") == "1"  # report every disk_cache hit (one line per call)
+
+def _atomic_write(path: str, write: Callable[[Any], None]) -> None:
+    # Write to a temp file and rename it into place, so concurrent readers and
+    # interrupted runs never see a half-written entry
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+class LLMCache:
+    """File-backed cache of LLM responses, one file per request hash."""
+
+    def __init__(self, cache_dir: str = LLM_CACHE_DIR) -> None:
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, str]], temperature: float) -> str:
+        raw = json.dumps({"model": model, "messages": messages, "temperature": temperature}, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.txt")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        if not os.path.exists(path):
+            print("💾 [*] LLM cache miss")
+            return None
+        print("💾 [+] LLM cache hit")
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def set(self, key: str, value: str) -> None:
+        _atomic_write(self._path(key), lambda f: f.write(value))
+
+llm_cache = LLMCache()
+
+def disk_cache(namespace: str, key_func: Optional[Callable[..., bytes]] = None, ttl: Optional[float] = None) -> Callable:
+    """Cache a function's JSON-serializable result under CACHE_DIR/<namespace>/<blake2b>.json.
+
+    By default the key is built from the call arguments; pass key_func to hash something
+    else (e.g. file contents instead of paths). Entries older than ttl seconds are recomputed.
+    None results are treated as failures and not cached. Coroutine functions are supported.
+    """
+    def decorator(func: Callable) -> Callable:
+        def cache_path(args: Any, kwargs: Any) -> str:
+            if key_func is not None:
+                raw_key = key_func(*args, **kwargs)
+            else:
+                raw_key = json.dumps([args, kwargs], sort_keys=True, default=str).encode("utf-8")
+            key = hashlib.blake2b(raw_key, digest_size=16).hexdigest()
+            return os.path.join(CACHE_DIR, namespace, f"{key}.json")
+
+        def is_fresh(path: str) -> bool:
+            return os.path.exists(path) and (ttl is None or time.time() - os.path.getmtime(path) < ttl)
+
+        def load(path: str) -> Any:
+            if VERBOSE:
+                print(f"💾 [+] Using cached result of {func.__name__}")
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+
+        def store(path: str, value: Any) -> None:
+            if value is not None:
+                _atomic_write(path, lambda f: json.dump(value, f, ensure_ascii=False))
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                path = cache_path(args, kwargs)
+                if is_fresh(path):
+                    return load(path)
+                value = await func(*args, **kwargs)
+                store(path, value)
+                return value
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            path = cache_path(args, kwargs)
+            if is_fresh(path):
+                return load(path)
+            value = func(*args, **kwargs)
+            store(path, value)
+            return value
+        return wrapper
+    return decorator
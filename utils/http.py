@@ -1,5 +1,17 @@
 import re
+from typing import Any, Callable
+import aiohttp
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from tenacity import (
+    retry,
+    retry_if_exception,
+    retry_if_exception_type,
+    retry_if_result,
+    stop_after_attempt,
+    wait_exponential,
+)
 from bs4 import BeautifulSoup
 from openai import OpenAI
 
@@ -12,28 +24,150 @@ def extract_question(html: str) -> str:
     question_text = p.get_text(strip=True).replace("Question:", "").strip()
     return question_text
 
+URL_PATTERN = re.compile(r'(https://[^\s\'"]+)')
+FLAG_PATTERN = re.compile(r'FLAG{[^}]+}')
+
 def find_url_in_text(text: str) -> str:
-    url_match = re.search(r'(https://[^\s\'"]+)', text)
+    url_match = URL_PATTERN.search(text)
     if not url_match:
         raise Exception("No URL found in the response")
     return url_match.group(1)
 
 def find_flag_in_text(text: str) -> str:
-    flag_match = re.search(r'FLAG{[^}]+}', text)
+    flag_match = FLAG_PATTERN.search(text)
     if not flag_match:
         raise Exception("No flag found in the response")
     return flag_match.group(0)
 
-def make_request(url: str, method: str = "get", **kwargs) -> requests.Response:
+# Shared session so repeated calls to the same host reuse keep-alive connections;
+# up to 32 per host, enough for the thread-pool fan-outs (e.g. s03e04 BFS)
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(pool_connections=10, pool_maxsize=32)
+# requests has no session-wide timeout; without one a stalled server hangs the script.
+# Endpoints that legitimately take longer pass their own timeout (None waits forever)
+DEFAULT_TIMEOUT = 30.0
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.mount("https://", _ADAPTER)
+
+# Transient failures (connection errors, timeouts, 5xx) are retried with exponential backoff.
+# 4xx responses come back immediately; after the last attempt the final 5xx response is returned as-is.
+RETRY_SETTINGS = dict(
+    wait=wait_exponential(multiplier=0.25, max=4),
+    stop=stop_after_attempt(4),
+    retry_error_callback=lambda retry_state: retry_state.outcome.result(),
+)
+# Only these are retried by default; a repeated POST may submit an answer or run a command
+# twice, so callers pass retry=True only when the POST is a plain lookup
+IDEMPOTENT_METHODS = ("get", "head")
+SUPPORTED_METHODS = IDEMPOTENT_METHODS + ("post",)
+
+def _send_request(url: str, method: str, **kwargs) -> requests.Response:
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    return _SESSION.request(method.upper(), url, **kwargs)
+
+_send_request_with_retry = retry(
+    retry=(
+        retry_if_exception_type((requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+        | retry_if_result(lambda response: response.status_code >= 500)
+    ),
+    **RETRY_SETTINGS,
+)(_send_request)
+
+# A POST that timed out may still have been processed, so even an opted-in POST is only
+# retried when the connection failed (ConnectTimeout is a ConnectionError, ReadTimeout is not)
+_send_post_with_retry = retry(
+    retry=(
+        retry_if_exception_type(requests.exceptions.ConnectionError)
+        | retry_if_result(lambda response: response.status_code >= 500)
+    ),
+    **RETRY_SETTINGS,
+)(_send_request)
+
+def make_request(url: str, method: str = "get", retry: bool | None = None, **kwargs) -> requests.Response:
     # try:
-    if method.lower() == "get":
-        response = requests.get(url, **kwargs)
-    elif method.lower() == "post":
-        response = requests.post(url, **kwargs)
-    else:
+    if method.lower() not in SUPPORTED_METHODS:
         raise ValueError(f"Unsupported HTTP method: {method}")
+    if retry is None:
+        retry = method.lower() in IDEMPOTENT_METHODS
+    if not retry:
+        send = _send_request
+    elif method.lower() in IDEMPOTENT_METHODS:
+        send = _send_request_with_retry
+    else:
+        send = _send_post_with_retry
+    response = send(url, method, **kwargs)
     
     # response.raise_for_status()
     return response
     # except requests.exceptions.RequestException as e:
     #     raise Exception(f"Request failed: {str(e)}")
+
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+def make_submitter(task_name: str, api_key: str, report_url: str) -> Callable[[Any], requests.Response]:
+    # The task/apikey part of the report payload is fixed per script, so build it once
+    payload_template = {"task": task_name, "apikey": api_key}
+
+    def submit(answer: Any) -> requests.Response:
+        payload = {**payload_template, "answer": answer}
+        return make_request(report_url, method="post", data=orjson.dumps(payload), headers=JSON_HEADERS)
+
+    return submit
+
+
+_ASYNC_SESSION = None
+
+def _get_async_session() -> aiohttp.ClientSession:
+    # aiohttp sessions must be created inside a running event loop, so build it lazily
+    global _ASYNC_SESSION
+    if _ASYNC_SESSION is None or _ASYNC_SESSION.closed:
+        connector = aiohttp.TCPConnector(limit=32, keepalive_timeout=60)
+        _ASYNC_SESSION = aiohttp.ClientSession(connector=connector)
+    return _ASYNC_SESSION
+
+async def _async_send_request(url: str, method: str, **kwargs) -> aiohttp.ClientResponse:
+    session = _get_async_session()
+    async with session.request(method.upper(), url, **kwargs) as response:
+        # Read the body before the connection goes back to the pool; .text()/.json() reuse it
+        await response.read()
+    return response
+
+_async_send_request_with_retry = retry(
+    retry=(
+        retry_if_exception_type((aiohttp.ClientConnectionError, TimeoutError))
+        | retry_if_result(lambda response: response.status >= 500)
+    ),
+    **RETRY_SETTINGS,
+)(_async_send_request)
+
+# Same rule as _send_post_with_retry; aiohttp's ServerTimeoutError is both a connection
+# error and a TimeoutError, so timeouts are excluded explicitly
+_async_send_post_with_retry = retry(
+    retry=(
+        retry_if_exception(
+            lambda e: isinstance(e, aiohttp.ClientConnectionError) and not isinstance(e, TimeoutError)
+        )
+        | retry_if_result(lambda response: response.status >= 500)
+    ),
+    **RETRY_SETTINGS,
+)(_async_send_request)
+
+async def async_make_request(url: str, method: str = "get", retry: bool | None = None, **kwargs) -> aiohttp.ClientResponse:
+    if method.lower() not in SUPPORTED_METHODS:
+        raise ValueError(f"Unsupported HTTP method: {method}")
+    if retry is None:
+        retry = method.lower() in IDEMPOTENT_METHODS
+    if not retry:
+        send = _async_send_request
+    elif method.lower() in IDEMPOTENT_METHODS:
+        send = _async_send_request_with_retry
+    else:
+        send = _async_send_post_with_retry
+    return await send(url, method, **kwargs)
+
+async def close_async_session() -> None:
+    global _ASYNC_SESSION
+    if _ASYNC_SESSION is not None and not _ASYNC_SESSION.closed:
+        await _ASYNC_SESSION.close()
+    _ASYNC_SESSION = None
@@ -1,20 +1,28 @@
 import re
 import html
+from typing import List, Pattern
 
-def find_flag_in_text(text: str) -> str:
-    flag_patterns = [
+FLAG_PATTERNS: List[Pattern[str]] = [
+    re.compile(pattern, re.MULTILINE | re.DOTALL | re.IGNORECASE)
+    for pattern in (
         r'FLG:[A-Z0-9_]+',                 # Standard format: FLG:ABC123
         r'FLG:[ \n\r\t]*[A-Z0-9_]+',       # With possible whitespace: FLG: ABC123 or split across lines
         r'F[ \n\r\t]*L[ \n\r\t]*G[ \n\r\t]*:[ \n\r\t]*[A-Z0-9_]+',  # Spaced out: F L G : ABC123
         r'[Ff][Ll][Gg][ \n\r\t]*:[ \n\r\t]*[A-Z0-9_]+'  # Case insensitive: flg: ABC123
-    ]
-    
-    for pattern in flag_patterns:
-        flag_match = re.search(pattern, text, re.MULTILINE | re.DOTALL | re.IGNORECASE)
-        print(f'🔍 [*] Trying pattern: {pattern}')
+    )
+]
+WHITESPACE_PATTERN = re.compile(r'[\n\r\t ]+')
+UNICODE_SPACE_PATTERN = re.compile(r'[\u00A0\u1680\u2000-\u200A\u2028\u2029\u202F\u205F\u3000]')
+BROKEN_LINE_END_PATTERN = re.compile(r'https?:/?/?$|FLG:?$|FLAG:?$', re.IGNORECASE)
+BROKEN_LINE_START_PATTERN = re.compile(r'^/?[A-Za-z0-9_.~:/?#[\]@!$&\'()*+,;=]+')
+
+def find_flag_in_text(text: str) -> str:
+    for pattern in FLAG_PATTERNS:
+        flag_match = pattern.search(text)
+        print(f'🔍 [*] Trying pattern: {pattern.pattern}')
         if flag_match:
             flag = flag_match.group(0)
-            flag = re.sub(r'[\n\r\t ]+', '', flag)
+            flag = WHITESPACE_PATTERN.sub('', flag)
             print(f'✅ [+] Match found: {flag}')
             return flag
     
@@ -31,12 +39,12 @@ def prepare_text_for_search(text: str) -> str:
     except Exception as e:
         print(f"⚠️ HTML unescape error: {e}")
     
-    text = re.sub(r'[\u00A0\u1680\u2000-\u200A\u2028\u2029\u202F\u205F\u3000]', ' ', text)
+    text = UNICODE_SPACE_PATTERN.sub(' ', text)
     
     lines = text.split('\n')
     for i in range(len(lines) - 1):
-        if (re.search(r'https?:/?/?$|FLG:?$|FLAG:?$', lines[i], re.IGNORECASE) and 
-            re.search(r'^/?[A-Za-z0-9_.~:/?#[\]@!$&\'()*+,;=]+', lines[i+1])):
+        if (BROKEN_LINE_END_PATTERN.search(lines[i]) and 
+            BROKEN_LINE_START_PATTERN.search(lines[i+1])):
             lines[i] = lines[i] + lines[i+1]
             lines[i+1] = ''
     